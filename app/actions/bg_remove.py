@@ -4,8 +4,15 @@ Removes background from images using rembg.
 """
 
 from typing import Optional
+
+import numpy as np
 from PIL import Image
 
+try:
+    from rembg import remove as _rembg_remove
+except ImportError:
+    _rembg_remove = None
+
 
 def remove_background(image: Image.Image) -> Optional[Image.Image]:
     """
@@ -17,21 +24,20 @@ def remove_background(image: Image.Image) -> Optional[Image.Image]:
     Returns:
         PIL Image with transparent background, or None on failure
     """
+    # Convert to RGBA once; both rembg and the fallback work on it
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    
+    if _rembg_remove is None:
+        print("rembg not installed. Install with: pip install rembg")
+        return _fallback_remove_background(image)
+    
     try:
-        from rembg import remove
-        
-        # Convert to RGBA if not already
-        if image.mode != "RGBA":
-            image = image.convert("RGBA")
-        
         # Remove background
-        result = remove(image)
+        result = _rembg_remove(image)
         
         return result
         
-    except ImportError:
-        print("rembg not installed. Install with: pip install rembg")
-        return _fallback_remove_background(image)
     except Exception as e:
         print(f"Error removing background: {e}")
         return _fallback_remove_background(image)
@@ -49,43 +55,32 @@ def _fallback_remove_background(image: Image.Image) -> Optional[Image.Image]:
         if image.mode != "RGBA":
             image = image.convert("RGBA")
         
-        # Get image data
-        data = image.getdata()
+        # Writable (H, W, 4) uint8 copy of the pixels
+        arr = np.array(image)
         
-        # Find the most common color (likely background)
+        # Find the most common edge color (likely background)
         # This is a very simple heuristic
-        from collections import Counter
-        
-        # Sample pixels from edges
-        width, height = image.size
-        edge_pixels = []
-        
-        for x in range(width):
-            edge_pixels.append(image.getpixel((x, 0)))
-            edge_pixels.append(image.getpixel((x, height - 1)))
-        for y in range(height):
-            edge_pixels.append(image.getpixel((0, y)))
-            edge_pixels.append(image.getpixel((width - 1, y)))
-        
-        # Find most common edge color
-        counter = Counter(edge_pixels)
-        bg_color = counter.most_common(1)[0][0]
+        edge_pixels = np.concatenate([
+            arr[0, :, :3],
+            arr[-1, :, :3],
+            arr[:, 0, :3],
+            arr[:, -1, :3],
+        ])
+        # Pack each RGB triple into one uint32 so the mode is a plain
+        # integer sort instead of a per-row comparison
+        rgb = edge_pixels.astype(np.uint32)
+        packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+        values, counts = np.unique(packed, return_counts=True)
+        bg = int(values[counts.argmax()])
+        bg_color = np.array([(bg >> 16) & 0xFF, (bg >> 8) & 0xFF, bg & 0xFF], dtype=np.int16)
         
-        # Create new image with transparency
-        new_data = []
+        # Pixels close to the background color become transparent
         tolerance = 30
+        diff = np.abs(arr[..., :3].astype(np.int16) - bg_color)
+        mask = diff.max(axis=-1) < tolerance
+        arr[mask] = (255, 255, 255, 0)
         
-        for item in data:
-            # Check if pixel is close to background color
-            if all(abs(item[i] - bg_color[i]) < tolerance for i in range(3)):
-                new_data.append((255, 255, 255, 0))  # Transparent
-            else:
-                new_data.append(item)
-        
-        result = Image.new("RGBA", image.size)
-        result.putdata(new_data)
-        
-        return result
+        return Image.fromarray(arr, "RGBA")
         
     except Exception as e:
         print(f"Fallback background removal failed: {e}")
@@ -94,8 +89,4 @@ def _fallback_remove_background(image: Image.Image) -> Optional[Image.Image]:
 
 def is_rembg_available() -> bool:
     """Check if rembg is available."""
-    try:
-        import rembg
-        return True
-    except ImportError:
-        return False
+    return _rembg_remove is not None
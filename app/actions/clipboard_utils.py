@@ -5,7 +5,51 @@ Simple text transformations that don't require LLM.
 
 import re
 import json
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, List, Tuple
+
+# Prefer RE2's linear-time engine for the extractors, which scan arbitrary
+# (possibly multi-MB) clipboard text. Falls back to the stdlib engine.
+try:
+    import re2 as _scan_re
+except ImportError:
+    _scan_re = re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_EMAIL_RE = _scan_re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_URL_RE = _scan_re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+_SLUG_DASH_RE = re.compile(r'-+')
+_LONG_INT_RE = re.compile(r'\d{19}')
+# Larger clipboards skip the result cache so it never pins huge strings
+_CACHE_MAX_CHARS = 65536
+
+_SLUG_KEEP = frozenset('abcdefghijklmnopqrstuvwxyz0123456789-')
+
+
+class _SlugTable(dict):
+    """
+    str.translate table for slugify: keeps [a-z0-9-], maps whitespace
+    to '-', and drops everything else. Entries are filled on first use.
+    """
+    
+    def __missing__(self, code: int) -> Optional[str]:
+        char = chr(code)
+        if char in _SLUG_KEEP:
+            value = char
+        elif char.isspace():
+            value = '-'
+        else:
+            value = None
+        self[code] = value
+        return value
+
+
+_SLUG_TABLE = _SlugTable()
 
 
 def apply_utility(content: str, operation: str) -> Optional[str]:
@@ -19,27 +63,12 @@ def apply_utility(content: str, operation: str) -> Optional[str]:
     Returns:
         Transformed text, or None on failure
     """
-    operations = {
-        "trim": trim_whitespace,
-        "dedupe_lines": dedupe_lines,
-        "sort_lines": sort_lines,
-        "extract_emails": extract_emails,
-        "extract_urls": extract_urls,
-        "prettify_json": prettify_json,
-        "lowercase": lambda x: x.lower(),
-        "uppercase": lambda x: x.upper(),
-        "title_case": lambda x: x.title(),
-        "reverse_lines": reverse_lines,
-        "number_lines": number_lines,
-        "remove_empty_lines": remove_empty_lines,
-        "slugify": slugify,
-        "url_encode": url_encode,
-        "url_decode": url_decode,
-    }
-    
-    op_func = operations.get(operation)
+    op_func = _OPS.get(operation)
     if op_func:
         try:
+            # Repeats on the same (small) clipboard are served from cache
+            if len(content) < _CACHE_MAX_CHARS:
+                return _cached_apply(operation, content)
             return op_func(content)
         except Exception as e:
             print(f"Error applying utility {operation}: {e}")
@@ -49,33 +78,75 @@ def apply_utility(content: str, operation: str) -> Optional[str]:
         return None
 
 
+@lru_cache(maxsize=128)
+def _cached_apply(operation: str, content: str) -> str:
+    """Memoized _OPS dispatch; every operation is a pure str -> str function."""
+    return _OPS[operation](content)
+
+
 def trim_whitespace(content: str) -> str:
     """Trim leading/trailing whitespace from each line and overall."""
-    lines = [line.strip() for line in content.split('\n')]
-    return '\n'.join(lines).strip()
+    return '\n'.join([line.strip() for line in content.split('\n')]).strip()
+
+
+def _split_lines(content: str) -> Tuple[List[str], bool]:
+    """
+    Split text on '\n' only (a '\r' before it stays part of the line),
+    unlike str.splitlines, which also breaks at form feeds, U+2028 etc.
+    
+    Returns:
+        Tuple of (lines, whether the input ended with a newline); a
+        trailing newline doesn't produce an empty last line
+    """
+    lines = content.split('\n')
+    terminated = content.endswith('\n')
+    if terminated:
+        lines.pop()
+    return lines, terminated
+
+
+def _join_lines(lines: List[str], terminated: bool) -> str:
+    """Join lines from _split_lines, restoring the original trailing newline."""
+    joined = '\n'.join(lines)
+    return joined + '\n' if terminated else joined
 
 
 def dedupe_lines(content: str) -> str:
     """Remove duplicate lines while preserving order."""
-    seen = set()
-    result = []
-    for line in content.split('\n'):
-        if line not in seen:
-            seen.add(line)
-            result.append(line)
-    return '\n'.join(result)
+    lines, terminated = _split_lines(content)
+    # dicts keep insertion order, so the first occurrence of each line wins
+    return _join_lines(list(dict.fromkeys(lines)), terminated)
 
 
 def sort_lines(content: str) -> str:
     """Sort lines alphabetically."""
-    lines = content.split('\n')
-    return '\n'.join(sorted(lines))
+    lines, terminated = _split_lines(content)
+    # Plain str sort: ASCII-only strings already compare via memcmp, so an
+    # encode-to-bytes fast path measured no faster
+    lines.sort()
+    return _join_lines(lines, terminated)
+
+
+def _to_lower(content: str) -> str:
+    """Lowercase text."""
+    return content.lower()
+
+
+def _to_upper(content: str) -> str:
+    """Uppercase text."""
+    return content.upper()
+
+
+def _to_title(content: str) -> str:
+    """Title-case text."""
+    return content.title()
 
 
 def reverse_lines(content: str) -> str:
     """Reverse the order of lines."""
-    lines = content.split('\n')
-    return '\n'.join(reversed(lines))
+    lines, terminated = _split_lines(content)
+    lines.reverse()
+    return _join_lines(lines, terminated)
 
 
 def number_lines(content: str) -> str:
@@ -93,34 +164,37 @@ def remove_empty_lines(content: str) -> str:
 
 def extract_emails(content: str) -> str:
     """Extract email addresses."""
-    pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    emails = re.findall(pattern, content)
+    emails = _EMAIL_RE.findall(content)
     return '\n'.join(sorted(set(emails)))
 
 
 def extract_urls(content: str) -> str:
     """Extract URLs."""
-    pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-    urls = re.findall(pattern, content)
+    urls = _URL_RE.findall(content)
     return '\n'.join(sorted(set(urls)))
 
 
 def prettify_json(content: str) -> str:
     """Prettify JSON with proper indentation."""
+    # orjson turns integers beyond 64 bits into floats, so leave anything
+    # with a 19+ digit run to the stdlib parser
+    if orjson is not None and not _LONG_INT_RE.search(content):
+        try:
+            return orjson.dumps(orjson.loads(content), option=orjson.OPT_INDENT_2).decode()
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. no NaN); let the stdlib decide
+            pass
     data = json.loads(content)
-    return json.dumps(data, indent=2)
+    return json.dumps(data, indent=2, ensure_ascii=False)
 
 
 def slugify(content: str) -> str:
     """Convert text to URL-friendly slug."""
-    # Convert to lowercase
-    slug = content.lower()
-    # Replace spaces with hyphens
-    slug = re.sub(r'\s+', '-', slug)
-    # Remove non-alphanumeric characters except hyphens
-    slug = re.sub(r'[^a-z0-9-]', '', slug)
+    # Lowercase, turn whitespace into hyphens and drop anything that isn't
+    # alphanumeric or a hyphen, all in one translate pass
+    slug = content.lower().translate(_SLUG_TABLE)
     # Remove multiple consecutive hyphens
-    slug = re.sub(r'-+', '-', slug)
+    slug = _SLUG_DASH_RE.sub('-', slug)
     # Trim hyphens from ends
     return slug.strip('-')
 
@@ -135,3 +209,23 @@ def url_decode(content: str) -> str:
     """URL decode text."""
     from urllib.parse import unquote
     return unquote(content)
+
+
+# Operation name -> implementation, built once at import
+_OPS = {
+    "trim": trim_whitespace,
+    "dedupe_lines": dedupe_lines,
+    "sort_lines": sort_lines,
+    "extract_emails": extract_emails,
+    "extract_urls": extract_urls,
+    "prettify_json": prettify_json,
+    "lowercase": _to_lower,
+    "uppercase": _to_upper,
+    "title_case": _to_title,
+    "reverse_lines": reverse_lines,
+    "number_lines": number_lines,
+    "remove_empty_lines": remove_empty_lines,
+    "slugify": slugify,
+    "url_encode": url_encode,
+    "url_decode": url_decode,
+}
@@ -3,7 +3,9 @@ Central action executor for Jarvis.
 Dispatches actions based on the LLM response.
 """
 
-from typing import Union, Tuple, Optional
+import importlib
+from functools import lru_cache
+from typing import Union, Tuple, Optional, Callable
 from PIL import Image
 
 from app.llm.schemas import AssistantResponse, ActionType
@@ -11,6 +13,21 @@ from app.clipboard import copy_text_to_clipboard, copy_image_to_clipboard
 from app.notify import notify_success, notify_error, notify_info
 
 
+@lru_cache(maxsize=None)
+def _lazy_action(module: str, name: str) -> Callable:
+    """
+    Import an action callable on first use and cache it.
+    Keeps heavy action modules (rembg, genai, ...) out of startup.
+    """
+    return getattr(importlib.import_module(f"app.actions.{module}"), name)
+
+
+def _preview(text: str, n: int = 80) -> str:
+    """Shorten text for a notification, adding '...' if it was cut."""
+    head = text[:n + 1]
+    return head[:n] + "..." if len(head) > n else head
+
+
 def execute_action(
     response: AssistantResponse,
     clipboard_content: Union[str, Image.Image, None],
@@ -23,57 +40,12 @@ def execute_action(
     action_type = response.action_type
     
     try:
-        if action_type == ActionType.COPY_TEXT_TO_CLIPBOARD:
-            return _handle_copy_text(response)
-        
-        elif action_type == ActionType.SHORT_REPLY:
-            return _handle_short_reply(response)
-        
-        elif action_type == ActionType.NO_ACTION:
-            return _handle_no_action(response)
-        
-        elif action_type == ActionType.SCREENSHOT_TO_CODE:
-            return _handle_screenshot_to_code(response, clipboard_content)
-        
-        elif action_type == ActionType.STRUCTURE_DATA:
-            return _handle_structure_data(response, clipboard_content)
-        
-        elif action_type == ActionType.DEBUG_CODE:
-            return _handle_debug_code(response, clipboard_content)
-        
-        elif action_type == ActionType.REWRITE_TEXT:
-            return _handle_rewrite_text(response, clipboard_content)
-        
-        elif action_type == ActionType.REMOVE_BACKGROUND:
-            return _handle_remove_background(response, clipboard_content)
-        
-        elif action_type == ActionType.TRANSLATE:
-            return _handle_translate(response, clipboard_content)
-        
-        elif action_type == ActionType.SAVE_TO_MEMORY:
-            return _handle_save_to_memory(response, clipboard_content, memory_client)
-        
-        elif action_type == ActionType.SEARCH_MEMORY:
-            return _handle_search_memory(response, memory_client)
-        
-        elif action_type == ActionType.DELETE_MEMORY:
-            return _handle_delete_memory(response, memory_client)
-        
-        elif action_type == ActionType.CLEAR_MEMORY:
-            return _handle_clear_memory(memory_client)
-        
-        elif action_type == ActionType.CLIPBOARD_UTILITY:
-            return _handle_clipboard_utility(response, clipboard_content)
-        
-        elif action_type == ActionType.CALCULATE:
-            return _handle_calculate(response)
-        
-        elif action_type == ActionType.SYNONYM:
-            return _handle_synonym(response, clipboard_content)
-        
-        else:
+        handler = _HANDLERS.get(action_type)
+        if handler is None:
             notify_error(f"Unknown action: {action_type}")
             return False, f"Unknown action type: {action_type}"
+        
+        return handler(response, clipboard_content, clipboard_type, memory_client)
             
     except Exception as e:
         error_msg = f"Error executing {action_type}: {str(e)}"
@@ -81,7 +53,12 @@ def execute_action(
         return False, error_msg
 
 
-def _handle_copy_text(response: AssistantResponse) -> Tuple[bool, str]:
+def _handle_copy_text(
+    response: AssistantResponse,
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
+) -> Tuple[bool, str]:
     """Handle COPY_TEXT_TO_CLIPBOARD action."""
     if not response.content:
         notify_error("No content to copy")
@@ -96,13 +73,23 @@ def _handle_copy_text(response: AssistantResponse) -> Tuple[bool, str]:
         return False, "Failed to copy to clipboard"
 
 
-def _handle_short_reply(response: AssistantResponse) -> Tuple[bool, str]:
+def _handle_short_reply(
+    response: AssistantResponse,
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
+) -> Tuple[bool, str]:
     """Handle SHORT_REPLY action."""
     notify_info(response.message)
     return True, response.message
 
 
-def _handle_no_action(response: AssistantResponse) -> Tuple[bool, str]:
+def _handle_no_action(
+    response: AssistantResponse,
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
+) -> Tuple[bool, str]:
     """Handle NO_ACTION."""
     if response.message:
         notify_info(response.message)
@@ -111,10 +98,12 @@ def _handle_no_action(response: AssistantResponse) -> Tuple[bool, str]:
 
 def _handle_screenshot_to_code(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle SCREENSHOT_TO_CODE action."""
-    from app.actions.screenshot_to_code import screenshot_to_code
+    screenshot_to_code = _lazy_action("screenshot_to_code", "screenshot_to_code")
     
     if not isinstance(clipboard_content, Image.Image):
         notify_error("Need an image in clipboard")
@@ -141,10 +130,12 @@ def _handle_screenshot_to_code(
 
 def _handle_structure_data(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle STRUCTURE_DATA action."""
-    from app.actions.structure_data import structure_data
+    structure_data = _lazy_action("structure_data", "structure_data")
     
     if not isinstance(clipboard_content, str):
         notify_error("Need text in clipboard")
@@ -163,9 +154,7 @@ def _handle_structure_data(
     if result:
         success = copy_text_to_clipboard(result)
         if success:
-            # Show preview in notification (first 80 chars)
-            preview = result[:80] + "..." if len(result) > 80 else result
-            notify_success(f"{target_format.upper()}: {preview}")
+            notify_success(f"{target_format.upper()}: {_preview(result)}")
             return True, f"Data structured as {target_format}"
         else:
             notify_error("Failed to copy")
@@ -177,10 +166,12 @@ def _handle_structure_data(
 
 def _handle_debug_code(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle DEBUG_CODE action."""
-    from app.actions.debug_code import debug_code
+    debug_code = _lazy_action("debug_code", "debug_code")
     
     if not isinstance(clipboard_content, str):
         notify_error("Need code in clipboard")
@@ -210,10 +201,12 @@ def _handle_debug_code(
 
 def _handle_rewrite_text(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle REWRITE_TEXT action."""
-    from app.actions.rewrite_text import rewrite_text
+    rewrite_text = _lazy_action("rewrite_text", "rewrite_text")
     
     if not isinstance(clipboard_content, str):
         notify_error("Need text in clipboard")
@@ -231,9 +224,7 @@ def _handle_rewrite_text(
     if result:
         success = copy_text_to_clipboard(result)
         if success:
-            # Show preview in notification (first 80 chars)
-            preview = result[:80] + "..." if len(result) > 80 else result
-            notify_success(preview)
+            notify_success(_preview(result))
             return True, "Text rewritten"
         else:
             notify_error("Failed to copy")
@@ -245,10 +236,12 @@ def _handle_rewrite_text(
 
 def _handle_remove_background(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle REMOVE_BACKGROUND action."""
-    from app.actions.bg_remove import remove_background
+    remove_background = _lazy_action("bg_remove", "remove_background")
     
     if not isinstance(clipboard_content, Image.Image):
         notify_error("Need an image in clipboard")
@@ -271,10 +264,12 @@ def _handle_remove_background(
 
 def _handle_translate(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle TRANSLATE action."""
-    from app.actions.translate import translate_text
+    translate_text = _lazy_action("translate", "translate_text")
     
     if not isinstance(clipboard_content, str):
         notify_error("Need text in clipboard")
@@ -291,9 +286,7 @@ def _handle_translate(
     if result:
         success = copy_text_to_clipboard(result)
         if success:
-            # Show preview in notification (first 80 chars)
-            preview = result[:80] + "..." if len(result) > 80 else result
-            notify_success(preview)
+            notify_success(_preview(result))
             return True, f"Translated to {target_language}"
         else:
             notify_error("Failed to copy")
@@ -306,16 +299,21 @@ def _handle_translate(
 def _handle_save_to_memory(
     response: AssistantResponse,
     clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
     memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle SAVE_TO_MEMORY action."""
-    from app.actions.memory_store import save_to_memory
+    save_to_memory = _lazy_action("memory_store", "save_to_memory")
     
     if memory_client is None:
         notify_error("Memory not enabled")
         return False, "Memory feature is not enabled"
     
-    content = str(clipboard_content) if clipboard_content else ""
+    if isinstance(clipboard_content, Image.Image):
+        notify_error("Can't save images to memory")
+        return False, "Memory only stores text"
+    
+    content = clipboard_content or ""
     params = response.memory
     label = params.label if params else None
     category = params.category if params else "note"
@@ -332,10 +330,12 @@ def _handle_save_to_memory(
 
 def _handle_search_memory(
     response: AssistantResponse,
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
     memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle SEARCH_MEMORY action."""
-    from app.actions.memory_store import search_memory
+    search_memory = _lazy_action("memory_store", "search_memory")
     
     if memory_client is None:
         notify_error("Memory not enabled")
@@ -350,7 +350,7 @@ def _handle_search_memory(
         # Try to extract query from the original command
         query = response.message if response.message else ""
     
-    results = search_memory(memory_client, query)
+    results = search_memory(memory_client, query, n_results=1)
     
     if results:
         # Return the EXACT content from the database
@@ -368,10 +368,12 @@ def _handle_search_memory(
 
 def _handle_clipboard_utility(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle CLIPBOARD_UTILITY action."""
-    from app.actions.clipboard_utils import apply_utility
+    apply_utility = _lazy_action("clipboard_utils", "apply_utility")
     
     if not isinstance(clipboard_content, str):
         notify_error("Need text in clipboard")
@@ -397,6 +399,8 @@ def _handle_clipboard_utility(
 
 def _handle_delete_memory(
     response: AssistantResponse,
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
     memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle DELETE_MEMORY action."""
@@ -413,12 +417,12 @@ def _handle_delete_memory(
         return False, "No query provided for deletion"
     
     # Search for matching items
-    results = memory_client.search_with_metadata(query, n_results=1)
+    results = memory_client.search_columns(query, n_results=1)
     
-    if results:
+    if results['ids']:
         # Delete the first match
-        doc_id = results[0]['id']
-        label = results[0].get('metadata', {}).get('label', 'item')
+        doc_id = results['ids'][0]
+        label = (results['metadatas'][0] or {}).get('label', 'item')
         success = memory_client.delete(doc_id)
         
         if success:
@@ -432,7 +436,12 @@ def _handle_delete_memory(
         return True, "No matching memory item found to delete"
 
 
-def _handle_clear_memory(memory_client: Optional[any]) -> Tuple[bool, str]:
+def _handle_clear_memory(
+    response: AssistantResponse,
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
+) -> Tuple[bool, str]:
     """Handle CLEAR_MEMORY action."""
     if memory_client is None:
         notify_error("Memory not enabled")
@@ -448,7 +457,12 @@ def _handle_clear_memory(memory_client: Optional[any]) -> Tuple[bool, str]:
         return False, "Failed to clear memory"
 
 
-def _handle_calculate(response: AssistantResponse) -> Tuple[bool, str]:
+def _handle_calculate(
+    response: AssistantResponse,
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
+) -> Tuple[bool, str]:
     """Handle CALCULATE action - evaluate math and copy result to clipboard."""
     # The LLM should put the calculated result in response.content
     result = response.content
@@ -468,7 +482,9 @@ def _handle_calculate(response: AssistantResponse) -> Tuple[bool, str]:
 
 def _handle_synonym(
     response: AssistantResponse,
-    clipboard_content: Union[str, Image.Image, None]
+    clipboard_content: Union[str, Image.Image, None],
+    clipboard_type: str,
+    memory_client: Optional[any]
 ) -> Tuple[bool, str]:
     """Handle SYNONYM action - find synonyms for clipboard word and copy to clipboard."""
     # The LLM should put synonyms in response.content
@@ -486,3 +502,23 @@ def _handle_synonym(
     else:
         notify_error("No synonyms found")
         return False, "No synonyms found"
+
+
+_HANDLERS = {
+    ActionType.COPY_TEXT_TO_CLIPBOARD: _handle_copy_text,
+    ActionType.SHORT_REPLY: _handle_short_reply,
+    ActionType.NO_ACTION: _handle_no_action,
+    ActionType.SCREENSHOT_TO_CODE: _handle_screenshot_to_code,
+    ActionType.STRUCTURE_DATA: _handle_structure_data,
+    ActionType.DEBUG_CODE: _handle_debug_code,
+    ActionType.REWRITE_TEXT: _handle_rewrite_text,
+    ActionType.REMOVE_BACKGROUND: _handle_remove_background,
+    ActionType.TRANSLATE: _handle_translate,
+    ActionType.SAVE_TO_MEMORY: _handle_save_to_memory,
+    ActionType.SEARCH_MEMORY: _handle_search_memory,
+    ActionType.DELETE_MEMORY: _handle_delete_memory,
+    ActionType.CLEAR_MEMORY: _handle_clear_memory,
+    ActionType.CLIPBOARD_UTILITY: _handle_clipboard_utility,
+    ActionType.CALCULATE: _handle_calculate,
+    ActionType.SYNONYM: _handle_synonym,
+}
@@ -74,11 +74,11 @@ def delete_memory(memory_client: Any, query: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        # First search for matching items
-        results = memory_client.search(query, n_results=10)
-        # Then delete them
-        for result in results:
-            memory_client.delete(result)
+        # Resolve matching items to their document IDs
+        ids = memory_client.search_columns(query, n_results=10)['ids']
+        # Then delete them in one call
+        if ids:
+            return memory_client.delete_many(ids)
         return True
     except Exception as e:
         print(f"Error deleting from memory: {e}")
@@ -3,20 +3,130 @@ Screenshot to code action for Jarvis.
 Converts UI screenshots to code using vision models.
 """
 
-import io
-from typing import Optional
+import asyncio
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
 from PIL import Image
 
+try:
+    import cv2
+    _CV2_COLOR_CONVERSIONS = {
+        "RGB": cv2.COLOR_RGB2BGR,
+        "RGBA": cv2.COLOR_RGBA2BGRA,
+        "L": None,
+    }
+except ImportError:
+    cv2 = None
+    _CV2_COLOR_CONVERSIONS = {}
+
 from app.llm.prompts import SCREENSHOT_TO_CODE_PROMPT
 from app.llm.schemas import VisionCodeResponse
 from app.config import config
+from app.llm.providers import get_raw_gemini_client
+from app.llm.response_cache import ResponseCache, content_digest
+from app.imaging import encode_png
+
+# ```lang fence line, body, optional closing ``` line (may be space-padded)
+_FENCE_RE = re.compile(r'```[^\n]*(?:\n(.*?))??(?:\n[^\S\n]*```[^\S\n]*)?\Z', re.DOTALL)
+
+_response_cache = ResponseCache(maxsize=32)
+
+
+def _encode_png_cv2(image: Image.Image) -> Optional[bytes]:
+    """
+    Encode with OpenCV's libpng binding if available.
+    Returns None when cv2 is missing or the mode isn't handled here.
+    """
+    if cv2 is None or image.mode not in _CV2_COLOR_CONVERSIONS:
+        return None
+    
+    arr = np.asarray(image)
+    conversion = _CV2_COLOR_CONVERSIONS[image.mode]
+    if conversion is not None:
+        # OpenCV expects BGR(A) channel order
+        arr = cv2.cvtColor(arr, conversion)
+    
+    ok, buf = cv2.imencode(".png", arr, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return buf.tobytes() if ok else None
+
+
+def _encode_png(image: Image.Image) -> bytes:
+    """
+    Encode a PIL Image as PNG, caching the bytes on the image itself.
+    Retries and repeat requests for the same clipboard image skip the encoder.
+    """
+    # Images read from a PNG pasteboard carry their original bytes
+    source = getattr(image, "_jarvis_source_png", None)
+    if source is not None and source[0] == image.size:
+        return source[1]
+    
+    cached = getattr(image, "_jarvis_png_cache", None)
+    # Keyed on size/mode so an in-place thumbnail() invalidates it
+    if cached is not None and cached[0] == (image.size, image.mode):
+        return cached[1]
+    
+    png_bytes = _encode_png_cv2(image)
+    if png_bytes is None:
+        # Fastest deflate setting: the bytes go straight to an API, where
+        # encode latency matters more than payload size
+        png_bytes = encode_png(image, compress_level=1)
+    image._jarvis_png_cache = ((image.size, image.mode), png_bytes)
+    return png_bytes
 
 
 def image_to_bytes(image: Image.Image) -> bytes:
     """Convert PIL Image to PNG bytes."""
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    return buffer.getvalue()
+    # Raw bytes go to Part.from_bytes as-is; no base64/data-URL round trip
+    return _encode_png(image)
+
+
+# Long-edge cap for vision input; larger screenshots only add encode time
+# and image tokens
+_VISION_MAX_SIZE = 1024
+
+
+def _downscale_for_vision(image: Image.Image) -> Image.Image:
+    """
+    Return image shrunk to fit _VISION_MAX_SIZE, leaving the caller's copy intact.
+    The shrunk copy is kept on the source image so repeats reuse it (and
+    its cached PNG bytes).
+    """
+    if image.width <= _VISION_MAX_SIZE and image.height <= _VISION_MAX_SIZE:
+        return image
+    
+    cached = getattr(image, "_jarvis_vision_copy", None)
+    if cached is not None and cached[0] == (image.size, image.mode):
+        return cached[1]
+    
+    small = image.copy()
+    small.thumbnail((_VISION_MAX_SIZE, _VISION_MAX_SIZE))
+    image._jarvis_vision_copy = ((image.size, image.mode), small)
+    return small
+
+
+def _prepare_request(
+    image: Image.Image,
+    target: str,
+    component_name: str
+) -> Tuple[bytes, str, tuple]:
+    """Resize and encode the image; return (png_bytes, prompt, cache_key)."""
+    image_bytes = image_to_bytes(_downscale_for_vision(image))
+    cache_key = (content_digest(image_bytes), target, component_name)
+    
+    prompt = SCREENSHOT_TO_CODE_PROMPT.format(
+        target=target,
+        component_name=component_name
+    )
+    return image_bytes, prompt, cache_key
+
+
+def _strip_code_fence(code: str) -> str:
+    """Remove a surrounding ``` fence from model output."""
+    if code.startswith("```"):
+        code = _FENCE_RE.match(code).group(1) or ""
+    return code
 
 
 def screenshot_to_code(
@@ -36,22 +146,14 @@ def screenshot_to_code(
         Generated code string, or None on failure
     """
     try:
-        import google.genai as genai
         from google.genai import types
         
-        client = genai.Client(api_key=config.GEMINI_API_KEY)
-        
-        # Resize image if too large (improves latency)
-        max_size = 1024
-        if image.width > max_size or image.height > max_size:
-            image.thumbnail((max_size, max_size))
-            
-        image_bytes = image_to_bytes(image)
+        image_bytes, prompt, cache_key = _prepare_request(image, target, component_name)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        prompt = SCREENSHOT_TO_CODE_PROMPT.format(
-            target=target,
-            component_name=component_name
-        )
+        client = get_raw_gemini_client()
         
         response = client.models.generate_content(
             model=config.GEMINI_MODEL,
@@ -64,16 +166,9 @@ def screenshot_to_code(
             ]
         )
         
-        code = response.text
-        
-        if code.startswith("```"):
-            lines = code.split("\n")
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            code = "\n".join(lines)
+        code = _strip_code_fence(response.text)
         
+        _response_cache.put(cache_key, code)
         return code
         
     except Exception as e:
@@ -81,25 +176,111 @@ def screenshot_to_code(
         return None
 
 
-def get_framework_template(target: str, component_name: str) -> str:
-    """Get a basic template for the target framework."""
+async def screenshot_to_code_async(
+    image: Image.Image,
+    target: str = "react_tailwind",
+    component_name: str = "Component",
+    client=None
+) -> Optional[str]:
+    """
+    Async variant of screenshot_to_code using the SDK's aio client.
     
-    if target == "react_tailwind":
-        return f'''export function {component_name}() {{
+    Args:
+        image: PIL Image of the UI screenshot
+        target: Target framework (react_tailwind, html_css, vue_tailwind)
+        component_name: Name for the generated component
+        client: genai.Client to use (defaults to the shared one)
+        
+    Returns:
+        Generated code string, or None on failure
+    """
+    try:
+        from google.genai import types
+        
+        image_bytes, prompt, cache_key = _prepare_request(image, target, component_name)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if client is None:
+            client = get_raw_gemini_client()
+        
+        response = await client.aio.models.generate_content(
+            model=config.GEMINI_MODEL,
+            contents=[
+                types.Part.from_bytes(
+                    data=image_bytes,
+                    mime_type='image/png',
+                ),
+                prompt
+            ]
+        )
+        
+        code = _strip_code_fence(response.text)
+        
+        _response_cache.put(cache_key, code)
+        return code
+        
+    except Exception as e:
+        print(f"Error in screenshot_to_code_async: {e}")
+        return None
+
+
+def screenshot_to_code_many(
+    images: List[Image.Image],
+    target: str = "react_tailwind",
+    component_name: str = "Component",
+    max_concurrency: int = 10
+) -> List[Optional[str]]:
+    """
+    Convert several screenshots concurrently.
+    
+    Args:
+        images: PIL Images of the UI screenshots
+        target: Target framework (react_tailwind, html_css, vue_tailwind)
+        component_name: Name for the generated components
+        max_concurrency: Maximum number of in-flight vision requests
+        
+    Returns:
+        Generated code per image in input order; None for failures
+    """
+    async def run_all() -> List[Optional[str]]:
+        import google.genai as genai
+        
+        # Async connections belong to the loop asyncio.run creates below,
+        # so each batch gets its own client rather than the shared one
+        client = genai.Client(api_key=config.GEMINI_API_KEY)
+        sem = asyncio.Semaphore(max_concurrency)
+        
+        async def bounded(image: Image.Image) -> Optional[str]:
+            async with sem:
+                return await screenshot_to_code_async(image, target, component_name, client)
+        
+        return await asyncio.gather(*[bounded(image) for image in images])
+    
+    try:
+        return asyncio.run(run_all())
+    except Exception as e:
+        print(f"Error in screenshot_to_code_many: {e}")
+        return [None] * len(images)
+
+
+# Starter templates per target; %(name)s is the component name
+_FRAMEWORK_TEMPLATES = {
+    "react_tailwind": '''export function %(name)s() {
   return (
     <div className="p-4">
-      {{/* Component content */}}
+      {/* Component content */}
     </div>
   );
-}}'''
+}''',
     
-    elif target == "html_css":
-        return f'''<!DOCTYPE html>
+    "html_css": '''<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>{component_name}</title>
+  <title>%(name)s</title>
   <style>
     /* Styles */
   </style>
@@ -107,10 +288,9 @@ def get_framework_template(target: str, component_name: str) -> str:
 <body>
   <!-- Content -->
 </body>
-</html>'''
+</html>''',
     
-    elif target == "vue_tailwind":
-        return f'''<script setup lang="ts">
+    "vue_tailwind": '''<script setup lang="ts">
 // Component logic
 </script>
 
@@ -118,6 +298,13 @@ def get_framework_template(target: str, component_name: str) -> str:
   <div class="p-4">
     <!-- Component content -->
   </div>
-</template>'''
-    
-    return ""
+</template>''',
+}
+
+
+def get_framework_template(target: str, component_name: str) -> str:
+    """Get a basic template for the target framework."""
+    template = _FRAMEWORK_TEMPLATES.get(target)
+    if template is None:
+        return ""
+    return template % {"name": component_name}
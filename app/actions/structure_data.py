@@ -4,9 +4,45 @@ Converts text to JSON, CSV, SQL, or Markdown tables.
 """
 
 import re
-from typing import Optional
+from typing import List, Optional
 
 from app.config import config
+from app.llm.providers import get_raw_groq_client, get_raw_gemini_client
+from app.llm.response_cache import ResponseCache, content_digest
+
+_response_cache = ResponseCache(maxsize=128)
+
+# ```lang fence line, body, optional closing ``` line (input is pre-stripped)
+_FENCE_RE = re.compile(r'```[^\n]*(?:\n(.*?))??(?:\n```)?\Z', re.DOTALL)
+
+_ITEM_MARKER_RE = re.compile(r'^---ITEM (\d+)---[ \t]*$', re.MULTILINE)
+
+# clean_markdown_table markup, matched in a single pass; the alternatives are
+# tried in order, so image-links win over images, images over links, and <br>
+# over the generic tag. "!" before an image-link is left to the first branch.
+_RE_MARKUP = re.compile(
+    r'\[!\[([^\]]*)\]\([^)]*\)\]\([^)]*\)'    # [![alt](img)](url) -> alt
+    r'|!\[(?!!\[)([^\]]*)\]\([^)]*\)'         # ![alt](url) -> alt
+    r'|\[([^\]]*)\]\([^)]*\)'                 # [text](url) -> text
+    r'|(<br\s*/?>)'                           # <br> -> space
+    r'|<[^<>]+>',                             # other HTML tags -> ''
+    re.IGNORECASE
+)
+_RE_WS = re.compile(r'\s+')
+_RE_DASH = re.compile(r'\|\s*-+\s*')
+_RE_PIPE = re.compile(r'\|\s+\|')
+
+
+def _markup_replacement(match: re.Match) -> str:
+    """Visible text for a _RE_MARKUP match."""
+    text = match.group(1)
+    if text is None:
+        text = match.group(2)
+    if text is None:
+        text = match.group(3)
+    if text is not None:
+        return text
+    return ' ' if match.group(4) else ''
 
 
 def clean_markdown_table(content: str) -> str:
@@ -14,55 +50,54 @@ def clean_markdown_table(content: str) -> str:
     Clean markdown/HTML from table data before processing.
     Extracts visible text from markdown links and images.
     """
-    # Remove markdown image/link combinations: [![alt](img)](url) -> alt
-    content = re.sub(r'\[!\[([^\]]*)\]\([^)]*\)\]\([^)]*\)', r'\1', content)
+    content = _RE_MARKUP.sub(_markup_replacement, content)
     
-    # Remove markdown images: ![alt](url) -> alt
-    content = re.sub(r'!\[([^\]]*)\]\([^)]*\)', r'\1', content)
-    
-    # Remove markdown links: [text](url) -> text
-    content = re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', content)
-    
-    # Remove HTML tags
-    content = re.sub(r'<[^>]+>', '', content)
-    
-    # Clean up <br> and whitespace
-    content = re.sub(r'<br\s*/?>', ' ', content, flags=re.IGNORECASE)
-    content = re.sub(r'\s+', ' ', content)
+    # Clean up whitespace
+    content = _RE_WS.sub(' ', content)
     
     # Clean table delimiters (multiple pipes, dashes)
-    content = re.sub(r'\|\s*-+\s*', '|', content)
-    content = re.sub(r'\|\s+\|', '|', content)
+    content = _RE_DASH.sub('|', content)
+    content = _RE_PIPE.sub('|', content)
     
     return content.strip()
 
 
+def _groq_raw_response(messages: list) -> str:
+    """Raw chat completion from Groq."""
+    client = get_raw_groq_client()
+    response = client.chat.completions.create(
+        model=config.GROQ_MODEL,
+        messages=messages,
+        temperature=0.1  # Low temp for accuracy
+    )
+    return response.choices[0].message.content
+
+
+def _gemini_raw_response(messages: list) -> str:
+    """Raw generate_content from Gemini."""
+    client = get_raw_gemini_client()
+    response = client.models.generate_content(
+        model=config.GEMINI_MODEL,
+        contents=messages[-1]["content"]  # User message
+    )
+    return response.text
+
+
+# The provider is fixed for the life of the process, so pick the call once
+_raw_llm_call = {
+    "groq": _groq_raw_response,
+    "gemini": _gemini_raw_response,
+}.get(config.MODEL_PROVIDER)
+
+
 def get_raw_llm_response(messages: list) -> str:
     """
     Get raw text response from LLM without instructor schema overhead.
     This matches how Groq Playground works.
     """
-    if config.MODEL_PROVIDER == "groq":
-        from groq import Groq
-        client = Groq(api_key=config.GROQ_API_KEY)
-        response = client.chat.completions.create(
-            model=config.GROQ_MODEL,
-            messages=messages,
-            temperature=0.1  # Low temp for accuracy
-        )
-        return response.choices[0].message.content
-    
-    elif config.MODEL_PROVIDER == "gemini":
-        import google.genai as genai
-        client = genai.Client(api_key=config.GEMINI_API_KEY)
-        response = client.models.generate_content(
-            model=config.GEMINI_MODEL,
-            contents=messages[-1]["content"]  # User message
-        )
-        return response.text
-    
-    else:
+    if _raw_llm_call is None:
         raise ValueError(f"Unsupported provider for raw output: {config.MODEL_PROVIDER}")
+    return _raw_llm_call(messages)
 
 
 def structure_data(
@@ -81,14 +116,26 @@ def structure_data(
     Returns:
         Structured data as string, or None on failure
     """
+    # Well-formed CSV/JSON converts deterministically; skip the LLM
+    local_result = _structure_locally(content, target_format, sql_dialect)
+    if local_result is not None:
+        return local_result
+    
+    cache_key = (content_digest(content), target_format, sql_dialect)
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         # Clean markdown/HTML first
         cleaned_content = clean_markdown_table(content)
         
         # Truncate if too long (prevent token overflow)
         max_chars = 15000
+        truncated_note = ""
         if len(cleaned_content) > max_chars:
-            cleaned_content = cleaned_content[:max_chars] + "\n... (truncated)"
+            cleaned_content = cleaned_content[:max_chars]
+            truncated_note = "\n... (truncated)"
         
         # Simple, direct prompt - no schema overhead
         prompt = f"""Convert this data to {target_format} format.
@@ -99,7 +146,7 @@ RULES:
 3. Copy values exactly as they appear
 
 DATA:
-{cleaned_content}"""
+{cleaned_content}{truncated_note}"""
         
         messages = [
             {"role": "system", "content": "You are a data converter. Output only the converted data, nothing else."},
@@ -109,19 +156,93 @@ DATA:
         # Get raw response without instructor overhead
         result = get_raw_llm_response(messages)
         
-        # Clean up any markdown code block wrappers
-        result = result.strip()
-        if result.startswith("```"):
-            lines = result.split("\n")
-            result = "\n".join(lines[1:-1] if lines[-1] == "```" else lines[1:])
-        
-        return result.strip()
+        result = _strip_code_fence(result)
+        _response_cache.put(cache_key, result)
+        return result
         
     except Exception as e:
         print(f"Error structuring data: {e}")
         return None
 
 
+def _strip_code_fence(result: str) -> str:
+    """Clean up any markdown code block wrappers around an LLM answer."""
+    result = result.strip()
+    if result.startswith("```"):
+        result = _FENCE_RE.match(result).group(1) or ""
+    return result.strip()
+
+
+def structure_data_many(
+    contents: List[str],
+    target_format: str,
+    sql_dialect: str = "postgres"
+) -> List[Optional[str]]:
+    """
+    Structure several texts into the target format with a single LLM call.
+    
+    Args:
+        contents: The text contents to structure
+        target_format: Target format (json, csv, sql, markdown_table)
+        sql_dialect: SQL dialect for SQL output
+        
+    Returns:
+        Structured data in input order; None for items that failed
+    """
+    keys = [(content_digest(c), target_format, sql_dialect) for c in contents]
+    results: List[Optional[str]] = [_response_cache.get(k) for k in keys]
+    pending = [i for i, r in enumerate(results) if r is None]
+    if not pending:
+        return results
+    if len(pending) == 1:
+        i = pending[0]
+        results[i] = structure_data(contents[i], target_format, sql_dialect)
+        return results
+    
+    try:
+        # Same per-item budget as structure_data, split across the batch
+        max_chars = max(15000 // len(pending), 1000)
+        blocks = []
+        for n, i in enumerate(pending):
+            cleaned_content = clean_markdown_table(contents[i])
+            if len(cleaned_content) > max_chars:
+                cleaned_content = cleaned_content[:max_chars] + "\n... (truncated)"
+            blocks.append(f"---ITEM {n}---\n{cleaned_content}")
+        data = "\n\n".join(blocks)
+        
+        prompt = f"""Convert each data item below to {target_format} format.
+
+RULES:
+1. Output ONLY the {target_format} data - no explanations or markdown code blocks
+2. Include ALL rows - never truncate
+3. Copy values exactly as they appear
+4. Start each converted item with its marker line exactly as given (---ITEM n---)
+
+DATA:
+{data}"""
+        
+        messages = [
+            {"role": "system", "content": "You are a data converter. Output only the converted data, nothing else."},
+            {"role": "user", "content": prompt}
+        ]
+        
+        response = get_raw_llm_response(messages)
+        
+        # re.split yields [preamble, n0, body0, n1, body1, ...]
+        parts = _ITEM_MARKER_RE.split(response)
+        for n, body in zip(parts[1::2], parts[2::2]):
+            n = int(n)
+            if n < len(pending):
+                i = pending[n]
+                results[i] = _strip_code_fence(body)
+                _response_cache.put(keys[i], results[i])
+        
+    except Exception as e:
+        print(f"Error structuring data batch: {e}")
+    
+    return results
+
+
 def csv_to_json(csv_content: str) -> str:
     """Convert CSV string to JSON string."""
     import csv
@@ -142,7 +263,7 @@ def csv_to_sql(csv_content: str, dialect: str) -> str:
     from io import StringIO
     
     try:
-        reader = csv.reader(StringIO(csv_content))
+        reader = csv.reader(StringIO(csv_content), skipinitialspace=True)
         headers = next(reader)
         clean_headers = [h.strip().replace(" ", "_").lower() for h in headers]
         table_name = "data_table"
@@ -153,13 +274,13 @@ def csv_to_sql(csv_content: str, dialect: str) -> str:
         statements.append(f"CREATE TABLE {table_name} ({cols});")
         
         # Inserts
+        insert_prefix = f"INSERT INTO {table_name} VALUES ('"
         for row in reader:
-            values = []
-            for val in row:
-                val = val.replace("'", "''") # Escape single quotes
-                values.append(f"'{val}'")
-            vals_str = ", ".join(values)
-            statements.append(f"INSERT INTO {table_name} VALUES ({vals_str});")
+            if not row:
+                continue
+            # Escape single quotes; "', '" supplies the quoting between cells
+            vals_str = "', '".join([val.replace("'", "''") for val in row])
+            statements.append(f"{insert_prefix}{vals_str}');")
             
         return "\n".join(statements)
     except Exception:
@@ -172,7 +293,15 @@ def csv_to_markdown(csv_content: str) -> str:
     from io import StringIO
     
     try:
-        reader = csv.reader(StringIO(csv_content))
+        if '"' in csv_content or '\r' in csv_content:
+            reader = csv.reader(StringIO(csv_content), skipinitialspace=True)
+        else:
+            # No quoting or CR line endings: plain splits give the same rows
+            # without csv's per-character state machine
+            raw_lines = csv_content.split('\n')
+            if raw_lines[-1] == '':
+                raw_lines.pop()
+            reader = iter([[cell.lstrip(' ') for cell in line.split(',')] if line else [] for line in raw_lines])
         headers = next(reader)
         
         lines = []
@@ -181,8 +310,7 @@ def csv_to_markdown(csv_content: str) -> str:
         # Separator
         lines.append("| " + " | ".join(["---"] * len(headers)) + " |")
         # Rows
-        for row in reader:
-            lines.append("| " + " | ".join(row) + " |")
+        lines.extend(["| " + " | ".join(row) + " |" for row in reader])
             
         return "\n".join(lines)
     except Exception:
@@ -214,7 +342,7 @@ def quick_structure_csv_to_json(content: str) -> Optional[str]:
     from io import StringIO
     
     try:
-        reader = csv.DictReader(StringIO(content))
+        reader = csv.DictReader(StringIO(content), skipinitialspace=True)
         rows = list(reader)
         if rows:
             return json.dumps(rows, indent=2)
@@ -222,3 +350,91 @@ def quick_structure_csv_to_json(content: str) -> Optional[str]:
         pass
     
     return None
+
+
+def _csv_sample(content: str) -> str:
+    """The first ~4 KB of content, cut back to a whole line."""
+    sample = content[:4096]
+    if len(content) > len(sample):
+        sample = sample[:sample.rfind('\n')]
+    return sample
+
+
+def _looks_like_csv(content: str) -> bool:
+    """
+    Check for comma-separated rows of one consistent width (>= 2 columns).
+    Stricter than csv.Sniffer, which happily accepts prose with commas.
+    """
+    import csv
+    from io import StringIO
+    
+    # Sample the head; a mismatch there is enough to bail out
+    try:
+        rows = [row for row in csv.reader(StringIO(_csv_sample(content)), skipinitialspace=True) if row]
+    except csv.Error:
+        return False
+    if len(rows) < 2:
+        return False
+    width = len(rows[0])
+    return width >= 2 and all(len(row) == width for row in rows)
+
+
+def _has_csv_header(content: str) -> bool:
+    """
+    Check that the first CSV row is a header: distinct, non-empty,
+    non-numeric cells that csv.Sniffer also reads as one. Without this,
+    headerless data ("Apples, 3") would lose its first row to the keys.
+    """
+    import csv
+    from io import StringIO
+    
+    sample = _csv_sample(content)
+    header = next(csv.reader(StringIO(sample), skipinitialspace=True), [])
+    cells = [cell.strip() for cell in header]
+    if not all(cells) or len(set(cells)) != len(cells):
+        return False
+    for cell in cells:
+        try:
+            float(cell)
+            return False
+        except ValueError:
+            pass
+    
+    try:
+        return csv.Sniffer().has_header(sample)
+    except csv.Error:
+        return False
+
+
+def _structure_locally(
+    content: str,
+    target_format: str,
+    sql_dialect: str
+) -> Optional[str]:
+    """
+    Convert without the LLM when the input is already CSV or JSON.
+    
+    Returns:
+        Converted text, or None if the LLM is needed
+    """
+    target_format = target_format.lower()
+    content = content.strip()
+    
+    if target_format == "json" and content[:1] in ("{", "["):
+        result = quick_structure_json(content)
+        if result is not None:
+            return result
+    
+    if target_format not in ("csv", "json", "sql", "markdown_table") or not _looks_like_csv(content):
+        return None
+    
+    if target_format == "csv":
+        return content
+    # Other targets turn row 0 into keys/columns; without a header, ask the LLM
+    if not _has_csv_header(content):
+        return None
+    if target_format == "json":
+        return quick_structure_csv_to_json(content)
+    if target_format == "sql":
+        return csv_to_sql(content, sql_dialect)
+    return csv_to_markdown(content)
@@ -3,11 +3,14 @@ Translation action for Jarvis.
 Translates text between languages.
 """
 
-from typing import Optional
+from typing import List, Optional
 
 from app.llm.providers import llm_client
 from app.llm.prompts import TRANSLATE_PROMPT
-from app.llm.schemas import TranslateResponse
+from app.llm.schemas import TranslateResponse, TranslateBatchResponse
+from app.llm.response_cache import ResponseCache, content_digest
+
+_response_cache = ResponseCache(maxsize=128)
 
 
 def translate_text(
@@ -24,6 +27,11 @@ def translate_text(
     Returns:
         Translated text, or None on failure
     """
+    cache_key = (content_digest(content), target_language)
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         prompt = TRANSLATE_PROMPT.format(
             target_language=target_language,
@@ -40,6 +48,7 @@ def translate_text(
             response_model=TranslateResponse
         )
         
+        _response_cache.put(cache_key, response.translated_text)
         return response.translated_text
         
     except Exception as e:
@@ -47,6 +56,66 @@ def translate_text(
         return None
 
 
+def translate_texts(
+    contents: List[str],
+    target_language: str = "english"
+) -> List[Optional[str]]:
+    """
+    Translate several texts with a single LLM call.
+    
+    Args:
+        contents: Texts to translate
+        target_language: Target language for translation
+        
+    Returns:
+        Translations in input order; None for items that failed
+    """
+    keys = [(content_digest(c), target_language) for c in contents]
+    results: List[Optional[str]] = [_response_cache.get(k) for k in keys]
+    pending = [i for i, r in enumerate(results) if r is None]
+    if not pending:
+        return results
+    if len(pending) == 1:
+        i = pending[0]
+        results[i] = translate_text(contents[i], target_language)
+        return results
+    
+    try:
+        items = "\n\n".join(
+            f"---ITEM {n}---\n{contents[i]}" for n, i in enumerate(pending)
+        )
+        prompt = TRANSLATE_PROMPT.format(
+            target_language=target_language,
+            content=items
+        )
+        
+        messages = [
+            {"role": "system", "content": (
+                "You are a professional translator. Each ---ITEM n--- block is a separate text; "
+                "return one translation per block, in order, without the markers."
+            )},
+            {"role": "user", "content": prompt}
+        ]
+        
+        response = llm_client.chat(
+            messages=messages,
+            response_model=TranslateBatchResponse
+        )
+        
+        if len(response.translations) != len(pending):
+            raise ValueError(
+                f"expected {len(pending)} translations, got {len(response.translations)}"
+            )
+        for i, translated in zip(pending, response.translations):
+            results[i] = translated
+            _response_cache.put(keys[i], translated)
+        
+    except Exception as e:
+        print(f"Error translating batch: {e}")
+    
+    return results
+
+
 def detect_language(content: str) -> Optional[str]:
     """
     Detect the language of the given text.
@@ -11,6 +11,8 @@ from PIL import Image
 from AppKit import NSPasteboard, NSPasteboardTypePNG, NSPasteboardTypeString, NSPasteboardTypeTIFF
 from Foundation import NSData
 
+from app.imaging import encode_png
+
 
 # Type alias for clipboard content
 ClipboardContent = Tuple[str, Union[str, Image.Image, None]]
@@ -24,6 +26,10 @@ def get_clipboard_content() -> ClipboardContent:
         Tuple of (content_type, content) where:
         - content_type is 'text', 'image', or 'empty'
         - content is str for text, PIL.Image for image, or None if empty
+        
+    Images are returned as opened by Image.open, which only parses the
+    header: pixels are decoded on first access, so callers that just need
+    the type, size, or (for PNG) the original bytes never pay for a decode.
     """
     pasteboard = NSPasteboard.generalPasteboard()
     
@@ -32,9 +38,15 @@ def get_clipboard_content() -> ClipboardContent:
         image_data = pasteboard.dataForType_(image_type)
         if image_data:
             try:
-                # Convert NSData to bytes and load as PIL Image
+                # Convert NSData to bytes and load as PIL Image. This is the
+                # only copy: BytesIO shares a bytes object's buffer (it would
+                # copy a memoryview), and the same bytes are kept for PNG
+                # pass-through
                 data_bytes = bytes(image_data)
-                image = Image.open(io.BytesIO(data_bytes))
+                image = Image.open(io.BytesIO(data_bytes))  # lazy: header only
+                if image_type == NSPasteboardTypePNG:
+                    # Keep the original encoding so it can be sent on as-is
+                    image._jarvis_source_png = (image.size, data_bytes)
                 return ('image', image)
             except Exception:
                 continue
@@ -79,9 +91,7 @@ def copy_image_to_clipboard(image: Image.Image) -> bool:
     """
     try:
         # Convert PIL Image to PNG bytes
-        buffer = io.BytesIO()
-        image.save(buffer, format='PNG')
-        png_data = buffer.getvalue()
+        png_data = encode_png(image)
         
         # Create NSData from bytes
         ns_data = NSData.dataWithBytes_length_(png_data, len(png_data))
@@ -27,6 +27,11 @@ class Config:
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o")
     GROQ_WHISPER_MODEL: str = os.getenv("GROQ_WHISPER_MODEL", "whisper-large-v3-turbo")
     
+    # Request Settings (seconds; timed-out chat calls are retried)
+    LLM_REQUEST_TIMEOUT: float = float(os.getenv("LLM_REQUEST_TIMEOUT", "15"))
+    LLM_VISION_TIMEOUT: float = float(os.getenv("LLM_VISION_TIMEOUT", "45"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    
     # Feature Flags
     ENABLE_MEMORY: bool = os.getenv("ENABLE_MEMORY", "false").lower() == "true"
     ENABLE_SCREENSHOT_TO_CODE: bool = os.getenv("ENABLE_SCREENSHOT_TO_CODE", "true").lower() == "true"
@@ -38,8 +43,18 @@ class Config:
     # UI Settings
     NOTIFICATION_TITLE: str = os.getenv("NOTIFICATION_TITLE", "Jarvis")
     
+    # Routing Cache Settings (cosine similarity for paraphrase hits; needs fastembed)
+    ROUTER_CACHE_THRESHOLD: float = float(os.getenv("ROUTER_CACHE_THRESHOLD", "0.92"))
+    
     # Memory Settings
     MEMORY_DB_PATH: str = os.getenv("MEMORY_DB_PATH", str(Path(__file__).parent / "memory" / "chroma_db"))
+    # HNSW index parameters; applied when the collection is created, so
+    # changing M or construction_ef takes a clear() and re-save to take effect
+    MEMORY_HNSW_M: int = int(os.getenv("MEMORY_HNSW_M", "24"))
+    MEMORY_HNSW_CONSTRUCTION_EF: int = int(os.getenv("MEMORY_HNSW_CONSTRUCTION_EF", "128"))
+    MEMORY_HNSW_SEARCH_EF: int = int(os.getenv("MEMORY_HNSW_SEARCH_EF", "64"))
+    # Open the store and load the embedding model in the background at startup
+    WARM_MEMORY: bool = os.getenv("WARM_MEMORY", "true").lower() == "true"
     
     @classmethod
     def validate(cls) -> list[str]:
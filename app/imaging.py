@@ -0,0 +1,42 @@
+"""
+PNG encoding shared by the clipboard and screenshot-to-code.
+Each thread reuses one BytesIO, so repeated encodes don't regrow a buffer.
+"""
+
+import io
+import threading
+
+from PIL import Image
+
+
+# A buffer that grew past this is dropped after use instead of being
+# kept for the life of the thread (bytes)
+_MAX_KEPT_BUFFER = 4 * 1024 * 1024
+
+_TLS = threading.local()
+
+
+def encode_png(image: Image.Image, **params) -> bytes:
+    """
+    Encode an image as PNG through this thread's reusable buffer.
+
+    Args:
+        image: PIL Image to encode
+        **params: Extra Image.save options (e.g. compress_level)
+
+    Returns:
+        PNG bytes
+    """
+    buf = getattr(_TLS, "buf", None)
+    if buf is None:
+        buf = _TLS.buf = io.BytesIO()
+    # Rewound, not truncated: only the bytes this encode wrote (up to
+    # tell()) are read back
+    buf.seek(0)
+    image.save(buf, format="PNG", **params)
+    with buf.getbuffer() as view:
+        png_bytes = view[:buf.tell()].tobytes()
+        kept = view.nbytes
+    if kept > _MAX_KEPT_BUFFER:
+        del _TLS.buf
+    return png_bytes
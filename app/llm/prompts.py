@@ -2,12 +2,9 @@
 System prompts for Jarvis LLM interactions.
 """
 
-MAIN_SYSTEM_PROMPT = """You are Jarvis, a voice-activated clipboard assistant for macOS.
-
-CURRENT CLIPBOARD: {clipboard_type}
-CLIPBOARD PREVIEW: {clipboard_preview}
-
-USER COMMAND: {command}
+# The main prompt is split so the long static part is an exact prefix on every
+# call (providers cache on prompt prefixes); only the tail is formatted.
+MAIN_SYSTEM_PROMPT_PREFIX = """You are Jarvis, a voice-activated clipboard assistant for macOS.
 
 AVAILABLE ACTIONS (choose ONE):
 
@@ -55,6 +52,15 @@ CRITICAL RULES:
 7. Message must be ≤50 chars
 """
 
+MAIN_SYSTEM_PROMPT_TAIL = """
+CURRENT CLIPBOARD: {clipboard_type}
+CLIPBOARD PREVIEW: {clipboard_preview}
+
+USER COMMAND: {command}
+"""
+
+MAIN_SYSTEM_PROMPT = MAIN_SYSTEM_PROMPT_PREFIX + MAIN_SYSTEM_PROMPT_TAIL
+
 
 SCREENSHOT_TO_CODE_PROMPT = """Convert this UI screenshot to a pixel-perfect React component.
 
@@ -133,8 +139,6 @@ INPUT DATA:
 
 DEBUG_CODE_PROMPT = """You are a code debugging expert. The user has provided code or an error trace.
 
-MODE: {mode}
-
 RULES:
 1. For fix_only: Return ONLY the corrected code, no explanations
 2. For explain_only: Return a brief explanation (3-6 lines max)
@@ -143,6 +147,8 @@ RULES:
 5. Output raw code, no markdown fences
 6. If it's a stack trace, identify the error and provide the fix
 
+MODE: {mode}
+
 CODE/ERROR:
 {content}
 """
@@ -150,9 +156,6 @@ CODE/ERROR:
 
 REWRITE_TEXT_PROMPT = """Rewrite this text according to the instructions.
 
-TONE: {tone}
-LENGTH PREFERENCE: {length}
-
 RULES:
 1. Output ONLY the rewritten text - no preamble
 2. Preserve all factual information
@@ -162,6 +165,9 @@ RULES:
 6. For grammar_only: Just fix errors, don't change tone
 7. Never add information that wasn't in the original
 
+TONE: {tone}
+LENGTH PREFERENCE: {length}
+
 ORIGINAL TEXT:
 {content}
 """
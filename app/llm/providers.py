@@ -3,33 +3,120 @@ LLM Provider abstraction for Jarvis.
 Supports Groq, Gemini, and OpenAI with instructor for structured outputs.
 """
 
-from typing import Optional, Any
+import asyncio
+import concurrent.futures
+from functools import lru_cache
+from typing import Optional, Any, Callable
 import instructor
 
 from app.config import config
 
+try:
+    import h2  # noqa: F401  (lets httpx speak HTTP/2)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
 
+# Un-wrapped SDK clients, shared so their HTTP connection pools stay warm
+_raw_groq_client = None
+_raw_gemini_client = None
+
+# Worker threads for sync calls whose SDK takes no per-call timeout
+_timeout_pool = None
+
+
+def _make_http_client() -> Any:
+    """Build a keep-alive httpx client, multiplexing over HTTP/2 when h2 is installed."""
+    import httpx
+    
+    return httpx.Client(
+        http2=_HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=60.0,
+    )
+
+
+def _make_async_http_client() -> Any:
+    """Build the pooled httpx.AsyncClient used by the async LLM clients."""
+    import httpx
+    
+    return httpx.AsyncClient(
+        http2=_HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+    )
+
+
+def get_raw_groq_client() -> Any:
+    """Get the shared plain Groq client (no instructor wrapper)."""
+    global _raw_groq_client
+    if _raw_groq_client is None:
+        from groq import Groq
+        _raw_groq_client = Groq(api_key=config.GROQ_API_KEY, http_client=_make_http_client())
+    return _raw_groq_client
+
+
+def get_raw_gemini_client() -> Any:
+    """Get the shared plain genai.Client (no instructor wrapper)."""
+    global _raw_gemini_client
+    if _raw_gemini_client is None:
+        import google.genai as genai
+        from google.genai import types
+        
+        # Milliseconds. Vision calls share this client, so it is their
+        # (longer) limit; LLMClient waits on text calls for less
+        _raw_gemini_client = genai.Client(
+            api_key=config.GEMINI_API_KEY,
+            http_options=types.HttpOptions(timeout=int(config.LLM_VISION_TIMEOUT * 1000))
+        )
+    return _raw_gemini_client
+
+
+@lru_cache(maxsize=1)
 def get_groq_client() -> Any:
     """Get an instructor-wrapped Groq client."""
-    from groq import Groq
-    
-    client = Groq(api_key=config.GROQ_API_KEY)
+    # Wrap the shared client so routing and raw calls use one connection pool;
+    # the copy leaves timeout retries to LLMClient
+    client = get_raw_groq_client().with_options(max_retries=0)
     return instructor.from_groq(client, mode=instructor.Mode.JSON)
 
 
+@lru_cache(maxsize=1)
 def get_gemini_client() -> Any:
     """Get an instructor-wrapped Gemini client."""
-    import google.genai as genai
-    
-    client = genai.Client(api_key=config.GEMINI_API_KEY)
+    client = get_raw_gemini_client()
     return instructor.from_genai(client, mode=instructor.Mode.GENAI_TOOLS)
 
 
+@lru_cache(maxsize=1)
 def get_openai_client() -> Any:
     """Get an instructor-wrapped OpenAI client."""
     from openai import OpenAI
     
-    client = OpenAI(api_key=config.OPENAI_API_KEY)
+    client = OpenAI(api_key=config.OPENAI_API_KEY, max_retries=0)
+    return instructor.from_openai(client)
+
+
+def get_async_groq_client() -> Any:
+    """Get an instructor-wrapped AsyncGroq client."""
+    from groq import AsyncGroq
+    
+    client = AsyncGroq(api_key=config.GROQ_API_KEY, http_client=_make_async_http_client(), max_retries=0)
+    return instructor.from_groq(client, mode=instructor.Mode.JSON)
+
+
+def get_async_gemini_client() -> Any:
+    """Get an instructor-wrapped Gemini client using the SDK's aio interface."""
+    # The shared client's .aio side, so async calls get the same timeout
+    client = get_raw_gemini_client()
+    return instructor.from_genai(client, mode=instructor.Mode.GENAI_TOOLS, use_async=True)
+
+
+def get_async_openai_client() -> Any:
+    """Get an instructor-wrapped AsyncOpenAI client."""
+    from openai import AsyncOpenAI
+    
+    client = AsyncOpenAI(api_key=config.OPENAI_API_KEY, http_client=_make_async_http_client(), max_retries=0)
     return instructor.from_openai(client)
 
 
@@ -50,6 +137,23 @@ def get_llm_client() -> Any:
         raise ValueError(f"Unknown provider: {config.MODEL_PROVIDER}")
 
 
+def get_async_llm_client() -> Any:
+    """
+    Get the async counterpart of get_llm_client.
+    
+    Returns:
+        Async instructor-wrapped client for structured outputs
+    """
+    if config.MODEL_PROVIDER == "groq":
+        return get_async_groq_client()
+    elif config.MODEL_PROVIDER == "gemini":
+        return get_async_gemini_client()
+    elif config.MODEL_PROVIDER == "openai":
+        return get_async_openai_client()
+    else:
+        raise ValueError(f"Unknown provider: {config.MODEL_PROVIDER}")
+
+
 def get_model_name() -> str:
     """Get the model name based on current provider."""
     if config.MODEL_PROVIDER == "groq":
@@ -62,6 +166,7 @@ def get_model_name() -> str:
         raise ValueError(f"Unknown provider: {config.MODEL_PROVIDER}")
 
 
+@lru_cache(maxsize=1)
 def get_vision_client() -> tuple[Any, str]:
     """
     Get a vision-capable client for screenshot-to-code.
@@ -81,6 +186,57 @@ def get_vision_client() -> tuple[Any, str]:
     raise ValueError("No vision-capable model available. Set GEMINI_API_KEY for screenshot-to-code.")
 
 
+@lru_cache(maxsize=1)
+def _timeout_error_types() -> tuple:
+    """Timeout exception classes of asyncio, httpx and the installed SDKs."""
+    types = [TimeoutError, asyncio.TimeoutError, concurrent.futures.TimeoutError]
+    try:
+        import httpx
+        types.append(httpx.TimeoutException)
+    except ImportError:
+        pass
+    try:
+        from groq import APITimeoutError as GroqTimeoutError
+        types.append(GroqTimeoutError)
+    except ImportError:
+        pass
+    try:
+        from openai import APITimeoutError as OpenAITimeoutError
+        types.append(OpenAITimeoutError)
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+def _is_timeout(error: Optional[BaseException]) -> bool:
+    """True for a timeout error, or one instructor re-raised wrapped."""
+    while error is not None:
+        if isinstance(error, _timeout_error_types()):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _run_with_timeout(call: Callable[[], Any], timeout: float) -> Any:
+    """
+    Run call on a worker thread and wait at most timeout seconds for it.
+    A call that overruns is abandoned, not cancelled; the client-level
+    timeout (see get_raw_gemini_client) ends it.
+    """
+    global _timeout_pool
+    if _timeout_pool is None:
+        _timeout_pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="llm-call")
+    return _timeout_pool.submit(call).result(timeout=timeout)
+
+
+def _timeout_kwargs() -> dict:
+    """Per-request timeout for providers whose create() accepts one."""
+    # genai's generate_content has no per-call timeout argument
+    if config.MODEL_PROVIDER in ("groq", "openai"):
+        return {"timeout": config.LLM_REQUEST_TIMEOUT}
+    return {}
+
+
 class LLMClient:
     """
     High-level LLM client wrapper.
@@ -92,6 +248,10 @@ class LLMClient:
         self._vision_client = None
         self._model = None
         self._vision_model = None
+        # Async clients hold one pooled httpx.AsyncClient each; use them
+        # from a single long-lived event loop
+        self._async_client = None
+        self._async_vision_client = None
     
     @property
     def client(self) -> Any:
@@ -108,20 +268,71 @@ class LLMClient:
             self._model = get_model_name()
         return self._model
     
+    def _load_vision(self) -> None:
+        """Resolve the vision client and model together."""
+        self._vision_client, self._vision_model = get_vision_client()
+    
     @property
     def vision_client(self) -> Any:
         """Lazy-load the vision client."""
         if self._vision_client is None:
-            self._vision_client, self._vision_model = get_vision_client()
+            self._load_vision()
         return self._vision_client
     
     @property
     def vision_model(self) -> str:
         """Get the vision model name."""
         if self._vision_model is None:
-            _, self._vision_model = get_vision_client()
+            self._load_vision()
         return self._vision_model
     
+    @property
+    def async_client(self) -> Any:
+        """Lazy-load the async main client."""
+        if self._async_client is None:
+            self._async_client = get_async_llm_client()
+        return self._async_client
+    
+    @property
+    def async_vision_client(self) -> Any:
+        """Lazy-load the async vision client (Gemini)."""
+        if self._async_vision_client is None:
+            if config.MODEL_PROVIDER != "gemini" and not config.GEMINI_API_KEY:
+                raise ValueError("No vision-capable model available. Set GEMINI_API_KEY for screenshot-to-code.")
+            self._async_vision_client = get_async_gemini_client()
+        return self._async_vision_client
+    
+    def _with_retries(self, call: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run call, retrying up to LLM_MAX_RETRIES times on timeouts.
+        The SDK clients are built with max_retries=0, so this (and
+        _awith_retries) is the only retry layer.
+        
+        Args:
+            call: The SDK request
+            timeout: If set, seconds to wait for each attempt, for calls
+                     whose SDK takes no per-call timeout
+        """
+        for attempt in range(config.LLM_MAX_RETRIES + 1):
+            try:
+                if timeout is not None:
+                    return _run_with_timeout(call, timeout)
+                return call()
+            except Exception as e:
+                if attempt == config.LLM_MAX_RETRIES or not _is_timeout(e):
+                    raise
+                print(f"LLM call timed out, retrying ({attempt + 1}/{config.LLM_MAX_RETRIES})")
+    
+    async def _awith_retries(self, make_call: Callable[[], Any], timeout: float) -> Any:
+        """Await make_call() with a per-attempt timeout, retrying like _with_retries."""
+        for attempt in range(config.LLM_MAX_RETRIES + 1):
+            try:
+                return await asyncio.wait_for(make_call(), timeout=timeout)
+            except Exception as e:
+                if attempt == config.LLM_MAX_RETRIES or not _is_timeout(e):
+                    raise
+                print(f"LLM call timed out, retrying ({attempt + 1}/{config.LLM_MAX_RETRIES})")
+    
     def chat(self, messages: list, response_model: Any, **kwargs) -> Any:
         """
         Send a chat request with structured output.
@@ -134,12 +345,15 @@ class LLMClient:
         Returns:
             Validated response matching response_model
         """
-        return self.client.chat.completions.create(
+        kwargs = {**_timeout_kwargs(), **kwargs}
+        # genai's generate_content takes no timeout argument; bound the wait
+        wait = None if "timeout" in kwargs else config.LLM_REQUEST_TIMEOUT
+        return self._with_retries(lambda: self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             response_model=response_model,
             **kwargs
-        )
+        ), wait)
     
     def vision_chat(self, messages: list, response_model: Any, **kwargs) -> Any:
         """
@@ -153,12 +367,51 @@ class LLMClient:
         Returns:
             Validated response matching response_model
         """
-        return self.vision_client.chat.completions.create(
+        # Images take longer, so vision gets its own, larger timeout
+        return self._with_retries(lambda: self.vision_client.chat.completions.create(
             model=self.vision_model,
             messages=messages,
             response_model=response_model,
             **kwargs
-        )
+        ), config.LLM_VISION_TIMEOUT)
+    
+    async def achat(self, messages: list, response_model: Any, **kwargs) -> Any:
+        """
+        Async version of chat.
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            response_model: Pydantic model for response validation
+            **kwargs: Additional arguments for the API call
+            
+        Returns:
+            Validated response matching response_model
+        """
+        return await self._awith_retries(lambda: self.async_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_model=response_model,
+            **kwargs
+        ), config.LLM_REQUEST_TIMEOUT)
+    
+    async def avision_chat(self, messages: list, response_model: Any, **kwargs) -> Any:
+        """
+        Async version of vision_chat.
+        
+        Args:
+            messages: List of message dicts, can include image content
+            response_model: Pydantic model for response validation
+            **kwargs: Additional arguments for the API call
+            
+        Returns:
+            Validated response matching response_model
+        """
+        return await self._awith_retries(lambda: self.async_vision_client.chat.completions.create(
+            model=self.vision_model,
+            messages=messages,
+            response_model=response_model,
+            **kwargs
+        ), config.LLM_VISION_TIMEOUT)
 
 
 # Singleton instance
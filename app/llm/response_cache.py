@@ -0,0 +1,51 @@
+"""
+Exact-match response cache for Jarvis actions.
+Re-triggering the hotkey on the same clipboard skips the LLM round trip.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple, Union
+
+
+def content_digest(content: Union[str, bytes]) -> bytes:
+    """Hash clipboard content so cache keys don't hold large strings."""
+    if isinstance(content, str):
+        content = content.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+class ResponseCache:
+    """
+    Small thread-safe LRU mapping input keys to LLM output strings.
+    Only successful results are stored, so failures are always retried.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[Hashable, ...], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[str]:
+        """Return the cached result for key, or None on a miss."""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: Tuple[Hashable, ...], result: Optional[str]) -> None:
+        """Store result under key, evicting the least recently used entry."""
+        if result is None:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
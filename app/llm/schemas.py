@@ -213,3 +213,9 @@ class TranslateResponse(BaseModel):
     translated_text: str = Field(description="The translated text")
     source_language: str = Field(description="Detected source language")
     target_language: str = Field(description="Target language")
+
+
+class TranslateBatchResponse(BaseModel):
+    """Response for translating several texts in one call."""
+    translations: List[str] = Field(description="Translations, one per input item, in input order")
+    target_language: str = Field(description="Target language")
@@ -0,0 +1,192 @@
+"""
+Semantic cache for intent routing.
+Repeated or paraphrased commands reuse an earlier routing decision
+instead of another LLM round trip.
+"""
+
+import re
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from fastembed import TextEmbedding
+except ImportError:
+    TextEmbedding = None
+
+
+_NORMALIZE_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _normalize(command: str) -> str:
+    """Lowercase and collapse punctuation/whitespace for exact matching."""
+    return _NORMALIZE_RE.sub(" ", command.lower()).strip()
+
+
+class SemanticCache:
+    """
+    Cache of routing payloads keyed by command and clipboard type.
+
+    Exact (normalized) repeats always hit. When fastembed is installed,
+    near-duplicates above the cosine threshold hit as well; without it
+    the cache is exact-match only.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        maxsize: int = 256,
+        model_name: str = "BAAI/bge-small-en-v1.5",
+        warmup_wait: float = 0.05
+    ):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.model_name = model_name
+        self.warmup_wait = warmup_wait
+        self._embedder = None
+        self._embedder_failed = TextEmbedding is None
+        self._lock = threading.Lock()
+        
+        # Set once a background warm_up() has loaded the model
+        self._warm_thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+        # Parallel lists; row i of _vectors belongs to _entries[i]
+        self._entries: List[Tuple[str, str, frozenset, str]] = []
+        self._vectors: Optional[np.ndarray] = None
+
+    @property
+    def embedder(self):
+        """Lazy-load the embedding model (None if unavailable)."""
+        if self._embedder is None and not self._embedder_failed:
+            try:
+                self._embedder = TextEmbedding(model_name=self.model_name)
+            except Exception as e:
+                print(f"Semantic cache disabled, could not load {self.model_name}: {e}")
+                self._embedder_failed = True
+        return self._embedder
+
+    def warm_up(self) -> None:
+        """
+        Load the embedding model and run one dummy embedding in a background
+        thread, so the model download and ONNX session setup happen at startup
+        instead of on the first command. Until it finishes, lookups and stores
+        fall back to exact matching rather than waiting on the load.
+        """
+        if self._warm_thread is not None or self._embedder_failed:
+            return
+        
+        def _warm():
+            try:
+                embedder = self.embedder
+                if embedder is not None:
+                    next(iter(embedder.embed(["warm up"])))
+            except Exception as e:
+                print(f"Error warming up semantic cache: {e}")
+            finally:
+                self._ready.set()
+        
+        self._warm_thread = threading.Thread(target=_warm, daemon=True)
+        self._warm_thread.start()
+    
+    def _embed(self, clipboard_type: str, command: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of the command, or None without an embedder."""
+        # Never block a command on a model that is still loading
+        if self._warm_thread is not None and not self._ready.wait(self.warmup_wait):
+            return None
+        embedder = self.embedder
+        if embedder is None:
+            return None
+        try:
+            vector = np.asarray(next(iter(embedder.embed([f"{clipboard_type}::{command}"]))), dtype=np.float32)
+        except Exception as e:
+            print(f"Error embedding command: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+        self,
+        command: str,
+        clipboard_type: str,
+        anchors: Iterable[str] = ()
+    ) -> Optional[str]:
+        """
+        Find a cached payload for this command.
+
+        Args:
+            command: The user's voice command
+            clipboard_type: Type of clipboard content ('text', 'image', 'empty')
+            anchors: This command's parameter words; a paraphrase hit
+                needs an entry stored with exactly the same set
+
+        Returns:
+            Cached payload string, or None on a miss
+        """
+        normalized = _normalize(command)
+        anchors = frozenset(a.lower() for a in anchors)
+        with self._lock:
+            for key, ctype, _, payload in reversed(self._entries):
+                if key == normalized and ctype == clipboard_type:
+                    return payload
+            if self._vectors is None:
+                return None
+
+        vector = self._embed(clipboard_type, command)
+        if vector is None:
+            return None
+
+        with self._lock:
+            if self._vectors is None:
+                return None
+            scores = self._vectors @ vector
+            # Best first; stop at the first entry that also passes the anchor check
+            for i in np.argsort(scores)[::-1]:
+                if scores[i] < self.threshold:
+                    break
+                _, ctype, entry_anchors, payload = self._entries[i]
+                if ctype == clipboard_type and entry_anchors == anchors:
+                    return payload
+        return None
+
+    def store(
+        self,
+        command: str,
+        clipboard_type: str,
+        payload: str,
+        anchors: Iterable[str] = ()
+    ) -> None:
+        """
+        Cache a payload for this command.
+
+        Args:
+            command: The user's voice command
+            clipboard_type: Type of clipboard content
+            payload: Serialized result to return on later hits
+            anchors: Parameter words the command named (e.g. "json"); a
+                paraphrase must name exactly the same ones to hit, so neither
+                "to csv" nor a bare "format this" reuses a "to json" decision
+        """
+        vector = self._embed(clipboard_type, command)
+        entry = (_normalize(command), clipboard_type, frozenset(a.lower() for a in anchors), payload)
+
+        with self._lock:
+            self._entries.append(entry)
+            # Keep rows aligned with entries; a zero row never clears the threshold
+            if vector is None and self._vectors is not None:
+                vector = np.zeros(self._vectors.shape[1], dtype=np.float32)
+            if vector is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((len(self._entries) - 1, vector.shape[0]), dtype=np.float32)
+                self._vectors = np.vstack([self._vectors, vector[np.newaxis, :]])
+            if len(self._entries) > self.maxsize:
+                self._entries.pop(0)
+                if self._vectors is not None:
+                    self._vectors = self._vectors[1:]
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._vectors = None
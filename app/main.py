@@ -6,27 +6,33 @@ Main entry point and orchestrator for the Jarvis voice assistant.
 Uses push-to-talk: hold fn key to speak, release to process.
 """
 
+import re
 import sys
-import time
 import signal
 import threading
-import io
-import wave
+import queue
+import struct
 from typing import Optional
 
 import sounddevice as sd
-import numpy as np
 
 from app.config import config, Config
 from app.clipboard import ClipboardMonitor, get_clipboard_content
-from app.notify import notify_success, notify_error, notify_info
+from app.notify import notify_success, notify_error, notify_info, flush_notifications
 from app.voice.keyboard import PushToTalk
 from app.voice.transcribe import transcribe_audio
 from app.voice.wakeword import is_stop_command, normalize_command
-from app.llm.router import route_intent
+from app.llm.router import route_intent, warm_up_route_cache
 from app.actions.executor import execute_action
 from app.memory.chroma_memory import get_memory
 
+# RIFF/WAVE header for PCM audio (see _to_wav)
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+# Commands that should pull in memory context before routing (substring match,
+# like the keyword list it replaces)
+_MEMORY_TRIGGER_RE = re.compile(r"find|where|search|recall|what was")
+
 
 class Jarvis:
     """
@@ -36,6 +42,7 @@ class Jarvis:
     
     def __init__(self, activation_key: str = "fn"):
         self.running = False
+        self.stop_event = threading.Event()
         self.clipboard_monitor = ClipboardMonitor()
         self.memory = get_memory()
         
@@ -44,11 +51,19 @@ class Jarvis:
         self.channels = 1
         
         self.recording = False
-        self.audio_frames = []
-        self.audio_lock = threading.Lock()
+        # Single-producer/single-consumer ring, so the audio callback never
+        # takes a lock. Byte indices only grow (position = index % size):
+        # _audio_head is written only by the audio callback, _audio_tail only
+        # by the push-to-talk handlers. Holds 120 s of 16-bit mono PCM.
+        self.audio_ring = memoryview(bytearray(self.sample_rate * 2 * 120))
+        self._audio_head = 0
+        self._audio_tail = 0
         self.audio_stream = None
         
-        self.processing = False
+        # Finished recordings wait here for the worker, so the user can speak
+        # again while the previous command is still being handled
+        self.utterances: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=2)
+        self.worker = threading.Thread(target=self._worker_loop, name="jarvis-proc", daemon=True)
         
         self.ptt = PushToTalk(
             on_activate=self._start_recording,
@@ -71,19 +86,45 @@ class Jarvis:
             print(f"Audio status: {status}")
         
         if self.recording:
-            with self.audio_lock:
-                # Store as int16
-                audio_int16 = (indata[:, 0] * 32767).astype(np.int16)
-                self.audio_frames.append(audio_int16.tobytes())
+            # Raw stream: indata is the driver's int16 PCM buffer, copied
+            # into the ring without building an array around it
+            data = memoryview(indata)
+            count = len(data)
+            ring = self.audio_ring
+            size = len(ring)
+            head = self._audio_head
+            if head + count - self._audio_tail > size:
+                return  # Over two minutes unread; drop rather than overwrite
+            
+            start = head % size
+            first = min(count, size - start)
+            ring[start:start + first] = data[:first]
+            if first < count:
+                ring[:count - first] = data[first:]
+            # Publish only after the samples are written
+            self._audio_head = head + count
+    
+    def _read_audio(self) -> bytes:
+        """Consume everything between tail and head as PCM bytes."""
+        head = self._audio_head
+        tail = self._audio_tail
+        ring = self.audio_ring
+        size = len(ring)
+        start = tail % size
+        count = head - tail
+        if start + count <= size:
+            audio_data = ring[start:start + count].tobytes()
+        else:
+            # Join the two views directly: one allocation, no temporary bytes
+            audio_data = b"".join((ring[start:], ring[:start + count - size]))
+        self._audio_tail = head
+        return audio_data
     
     def _start_recording(self):
         """Called when activation key is pressed."""
-        if self.processing:
-            return
-        
-        with self.audio_lock:
-            self.audio_frames = []
-            self.recording = True
+        # Discard anything captured since the last recording
+        self._audio_tail = self._audio_head
+        self.recording = True
         
         print("\r🎤 Listening...            ", end="", flush=True)
     
@@ -92,31 +133,35 @@ class Jarvis:
         if not self.recording:
             return
         
-        with self.audio_lock:
-            self.recording = False
-            audio_data = b''.join(self.audio_frames)
-            self.audio_frames = []
+        self.recording = False
         
         print("\r⏹️  Processing...          ", end="", flush=True)
         print() # New line
         
-        if len(audio_data) < 3200:  # Less than 0.1 seconds
+        # Check the size before copying anything out of the ring
+        if self._audio_head - self._audio_tail < 3200:  # Less than 0.1 seconds
+            self._audio_tail = self._audio_head
             print("Recording too short, ignoring")
             return
         
-        threading.Thread(
-            target=self._process_audio,
-            args=(audio_data,),
-            daemon=True
-        ).start()
+        audio_data = self._read_audio()
+        
+        try:
+            self.utterances.put_nowait(audio_data)
+        except queue.Full:
+            print("Still working on earlier commands, ignoring")
+            notify_info("Busy")
+    
+    def _worker_loop(self):
+        """Handle queued recordings one at a time until stop() sends None."""
+        while True:
+            audio_data = self.utterances.get()
+            if audio_data is None:
+                return
+            self._process_audio(audio_data)
     
     def _process_audio(self, audio_data: bytes):
         """Process recorded audio."""
-        if self.processing:
-            return
-        
-        self.processing = True
-        
         try:
             wav_data = self._to_wav(audio_data)
             
@@ -137,11 +182,15 @@ class Jarvis:
             command = normalize_command(command)
             
             clipboard_type, clipboard_content = get_clipboard_content()
-            print(f"📋 Clipboard: {clipboard_type} ({len(str(clipboard_content)) if clipboard_content else 0} chars)")
+            if clipboard_type == "image":
+                clipboard_size = "{}x{}".format(*clipboard_content.size)
+            else:
+                clipboard_size = f"{len(clipboard_content) if clipboard_content else 0} chars"
+            print(f"📋 Clipboard: {clipboard_type} ({clipboard_size})")
             
             memory_context = None
             if self.memory:
-                if any(word in command.lower() for word in ["find", "where", "search", "recall", "what was"]):
+                if _MEMORY_TRIGGER_RE.search(command.lower()):
                     results = self.memory.search(command, n_results=3)
                     if results:
                         memory_context = "\n".join([f"- {r[:200]}" for r in results])
@@ -173,18 +222,32 @@ class Jarvis:
             import traceback
             traceback.print_exc()
             notify_error("Processing error")
-        finally:
-            self.processing = False
 
+    def _warm_up(self):
+        """
+        Initialize the lazily built clients before the first command.
+        Makes no API calls: this only imports the SDKs and builds the
+        shared clients. The memory store warms itself (see get_memory).
+        """
+        try:
+            from app.llm.providers import llm_client, get_raw_groq_client
+            
+            get_raw_groq_client()  # Whisper
+            llm_client.client
+        except Exception as e:
+            print(f"Warm-up skipped: {e}")
+    
     def _to_wav(self, audio_data: bytes) -> bytes:
         """Convert raw PCM audio to WAV format."""
-        buffer = io.BytesIO()
-        with wave.open(buffer, 'wb') as wav:
-            wav.setnchannels(self.channels)
-            wav.setsampwidth(2)  # 16-bit
-            wav.setframerate(self.sample_rate)
-            wav.writeframes(audio_data)
-        return buffer.getvalue()
+        # Same 44-byte header the wave module writes, without streaming the
+        # payload through a BytesIO and copying it back out
+        byte_rate = self.sample_rate * self.channels * 2  # 16-bit
+        header = _WAV_HEADER.pack(
+            b'RIFF', 36 + len(audio_data), b'WAVE',
+            b'fmt ', 16, 1, self.channels, self.sample_rate, byte_rate, self.channels * 2, 16,
+            b'data', len(audio_data)
+        )
+        return header + audio_data
     
     def run(self):
         """Start Jarvis."""
@@ -197,6 +260,9 @@ class Jarvis:
             print("\nPlease fix configuration errors and try again.")
             sys.exit(1)
         
+        # Load the embedding model while the user gets ready to speak
+        warm_up_route_cache()
+        
         print(f"\nProvider: {config.MODEL_PROVIDER}")
         print(f"Memory: {'Enabled' if config.ENABLE_MEMORY else 'Disabled'}")
         
@@ -207,24 +273,26 @@ class Jarvis:
         print("Say 'stop' to exit.\n")
         
         self.running = True
+        self.worker.start()
         
         notify_success(f"Ready! Hold {hotkey_display}")
+        threading.Thread(target=self._warm_up, name="jarvis-warmup", daemon=True).start()
         
         try:
             self.ptt.start()
             
-            self.audio_stream = sd.InputStream(
+            self.audio_stream = sd.RawInputStream(
                 samplerate=self.sample_rate,
                 channels=self.channels,
-                dtype='float32',
+                dtype='int16',  # PortAudio converts; matches the WAV/Whisper format
                 callback=self._audio_callback
             )
             self.audio_stream.start()
             
             print("Ready and waiting...")
             
-            while self.running:
-                time.sleep(0.1)
+            # Block until stop() instead of polling (no idle wakeups)
+            self.stop_event.wait()
                     
         except KeyboardInterrupt:
             print("\nInterrupted by user")
@@ -238,6 +306,7 @@ class Jarvis:
         """Stop Jarvis."""
         self.running = False
         self.recording = False
+        self.stop_event.set()
         
         if self.audio_stream:
             self.audio_stream.stop()
@@ -245,6 +314,17 @@ class Jarvis:
             self.audio_stream = None
         
         self.ptt.stop()
+        
+        # Drop pending recordings and wake the worker so it exits
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                break
+        self.utterances.put_nowait(None)
+        
+        # Let queued notifications (e.g. "Goodbye!") show before exit
+        flush_notifications()
         print("\nJarvis stopped.")
 
 
@@ -3,31 +3,116 @@ ChromaDB-based semantic memory for Jarvis.
 Provides persistent vector storage for clipboard items and notes.
 """
 
+import atexit
+import os
+import threading
+import time
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from itertools import islice
+from typing import Iterator, List, Dict, Any, Optional
 from pathlib import Path
 
+import numpy as np
+
 from app.config import config
 
 
+# Metadata value types Chroma can store; the set catches the common
+# exact-type case before falling back to isinstance for subclasses
+_META_TYPES = (str, int, float, bool)
+_META_TYPE_SET = frozenset(_META_TYPES)
+
+# Query embeddings kept per ChromaMemory instance
+_EMBED_CACHE_SIZE = 1024
+
+
+def _clean_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop None and any value Chroma can't store."""
+    return {
+        k: v for k, v in metadata.items()
+        if type(v) in _META_TYPE_SET or (v is not None and isinstance(v, _META_TYPES))
+    }
+
+
+def _time_ordered_id() -> str:
+    """
+    New document id in UUIDv7 layout: a millisecond timestamp followed by
+    random bits. Ids still look like uuid4 strings, but later ones sort
+    after earlier ones, so inserts append to SQLite's id index instead of
+    landing on random pages.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | (0x7 << 76)  # version 7
+    value = value & ~(0x3 << 62) | (0x2 << 62)  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+
+def _original_contents(metadatas: List[Dict[str, Any]], documents: List[str]) -> List[str]:
+    """Original content from metadata (clean, without the label prefix)."""
+    return [meta.get('original_content', doc) for meta, doc in zip(metadatas, documents)]
+
+
 class ChromaMemory:
     """
     Semantic memory store using ChromaDB.
     Provides save, search, and delete operations.
     """
     
-    def __init__(self, persist_directory: Optional[str] = None):
+    def __init__(
+        self,
+        persist_directory: Optional[str] = None,
+        batch_size: int = 1,
+        flush_interval: float = 0.1,
+        search_cache_ttl: float = 30.0
+    ):
         """
         Initialize the memory store.
         
         Args:
             persist_directory: Directory for persistent storage.
                              Defaults to config.MEMORY_DB_PATH.
+            batch_size: Buffer add() calls and have a background writer
+                        thread write them to Chroma in one call once this
+                        many are pending (1 = write immediately, no thread).
+                        Reads always flush first, so buffered items are
+                        never missing from results.
+            flush_interval: With batching, the writer also flushes
+                            whatever is buffered every this many seconds
+            search_cache_ttl: Seconds a search() result is reused for the
+                              same query (0 = no caching). Any write in
+                              this process drops the cached results.
         """
         self.persist_directory = persist_directory or config.MEMORY_DB_PATH
         self._client = None
         self._collection = None
+        self._embedding_function = None
+        # Query text -> embedding (LRU), so repeated searches skip the model
+        self._embed_cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._embed_cache_lock = threading.Lock()
+        
+        # (query, n_results) -> (stored_at, results) for search()
+        self.search_cache_ttl = search_cache_ttl
+        self._search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+        # Bumped by every write, so a search that raced one isn't cached
+        self._search_generation = 0
+        
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer_ids: List[str] = []
+        self._buffer_docs: List[str] = []
+        self._buffer_metas: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        # Held for a whole flush, so a read that flushes also waits for a
+        # batch the writer thread has already taken off the buffer
+        self._flush_lock = threading.Lock()
+        self._flush_due = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        if batch_size > 1:
+            self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
     
     @property
     def client(self):
@@ -41,16 +126,73 @@ class ChromaMemory:
             self._client = chromadb.PersistentClient(path=self.persist_directory)
         return self._client
     
+    @property
+    def embedding_function(self):
+        """Lazy-load the embedding model (Chroma's default)."""
+        if self._embedding_function is None:
+            from chromadb.utils import embedding_functions
+            
+            self._embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return self._embedding_function
+    
+    def _embed_queries(self, queries: List[str]) -> list:
+        """
+        Embed queries with the collection's embedding function, reusing
+        cached embeddings; all misses go to the model in one call.
+        """
+        with self._embed_cache_lock:
+            embeddings = [self._embed_cache.get(query) for query in queries]
+            for query, embedding in zip(queries, embeddings):
+                if embedding is not None:
+                    self._embed_cache.move_to_end(query)
+        
+        misses = list(dict.fromkeys(q for q, e in zip(queries, embeddings) if e is None))
+        if not misses:
+            return embeddings
+        
+        computed = dict(zip(misses, self.embedding_function(misses)))
+        with self._embed_cache_lock:
+            self._embed_cache.update(computed)
+            while len(self._embed_cache) > _EMBED_CACHE_SIZE:
+                self._embed_cache.popitem(last=False)
+        return [computed[q] if e is None else e for q, e in zip(queries, embeddings)]
+    
+    def _embed_query(self, query: str):
+        """Embed one query, via the cache."""
+        return self._embed_queries([query])[0]
+    
     @property
     def collection(self):
         """Get or create the memory collection."""
         if self._collection is None:
+            # Index settings only apply when the collection is first created;
+            # an existing collection keeps the ones it was built with
             self._collection = self.client.get_or_create_collection(
                 name="jarvis_memory",
-                metadata={"hnsw:space": "cosine"}
+                embedding_function=self.embedding_function,
+                metadata={
+                    "hnsw:space": "cosine",
+                    "hnsw:M": config.MEMORY_HNSW_M,
+                    "hnsw:construction_ef": config.MEMORY_HNSW_CONSTRUCTION_EF,
+                    "hnsw:search_ef": config.MEMORY_HNSW_SEARCH_EF,
+                    "hnsw:batch_size": 500,
+                    "hnsw:sync_threshold": 2000,
+                }
             )
         return self._collection
     
+    def warm_up(self) -> None:
+        """
+        Open the collection and embed a throwaway query in a background
+        thread, so the first real search doesn't pay for loading Chroma
+        and the embedding model.
+        """
+        # search() already reports and swallows its own errors
+        threading.Thread(
+            target=self.search, args=("warm up",), kwargs={"n_results": 1},
+            name="memory-warmup", daemon=True
+        ).start()
+    
     def add(
         self,
         content: str,
@@ -66,7 +208,91 @@ class ChromaMemory:
         Returns:
             ID of the stored document
         """
-        doc_id = str(uuid.uuid4())
+        doc_id, searchable_doc, doc_metadata = self._build_record(content, metadata)
+        self._invalidate_searches()
+        
+        if self.batch_size <= 1:
+            self.collection.add(
+                documents=[searchable_doc],
+                metadatas=[doc_metadata],
+                ids=[doc_id]
+            )
+            return doc_id
+        
+        with self._buffer_lock:
+            self._buffer_ids.append(doc_id)
+            self._buffer_docs.append(searchable_doc)
+            self._buffer_metas.append(doc_metadata)
+            full = len(self._buffer_ids) >= self.batch_size
+        if full:
+            self._flush_due.set()
+        
+        return doc_id
+    
+    def add_many(
+        self,
+        contents: List[str],
+        metadatas: Optional[List[Optional[Dict[str, Any]]]] = None
+    ) -> List[str]:
+        """
+        Add several items to memory in one Chroma call.
+        
+        Args:
+            contents: Text contents to store
+            metadatas: Optional metadata per item (same length as contents)
+            
+        Returns:
+            IDs of the stored documents, in order
+        """
+        if not contents:
+            return []
+        if metadatas is None:
+            metadatas = [None] * len(contents)
+        
+        records = [self._build_record(c, m) for c, m in zip(contents, metadatas)]
+        self._invalidate_searches()
+        self.collection.add(
+            documents=[doc for _, doc, _ in records],
+            metadatas=[meta for _, _, meta in records],
+            ids=[doc_id for doc_id, _, _ in records]
+        )
+        return [doc_id for doc_id, _, _ in records]
+    
+    def flush(self) -> None:
+        """Write any buffered add() calls to Chroma in a single call."""
+        with self._flush_lock:
+            with self._buffer_lock:
+                if not self._buffer_ids:
+                    return
+                ids, docs, metas = self._buffer_ids, self._buffer_docs, self._buffer_metas
+                self._buffer_ids, self._buffer_docs, self._buffer_metas = [], [], []
+            try:
+                self.collection.add(documents=docs, metadatas=metas, ids=ids)
+            except Exception:
+                # Put the batch back in front of anything added meanwhile
+                with self._buffer_lock:
+                    self._buffer_ids[:0] = ids
+                    self._buffer_docs[:0] = docs
+                    self._buffer_metas[:0] = metas
+                raise
+    
+    def _writer_loop(self) -> None:
+        """Background writer: flush when a batch fills or every flush_interval."""
+        while True:
+            self._flush_due.wait(self.flush_interval)
+            self._flush_due.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing memory batch: {e}")
+    
+    def _build_record(
+        self,
+        content: str,
+        metadata: Optional[Dict[str, Any]]
+    ) -> tuple:
+        """Build the (id, document, metadata) triple stored for one item."""
+        doc_id = _time_ordered_id()
         
         # Get label for searchability
         label = metadata.get("label", "") if metadata else ""
@@ -77,24 +303,14 @@ class ChromaMemory:
         
         # Build metadata - store original content for retrieval
         doc_metadata = {
-            "timestamp": datetime.now().isoformat(),
-            "content_preview": content[:100] if len(content) > 100 else content,
+            "timestamp": time.time_ns(),  # epoch nanoseconds
             "original_content": content  # Store original for clean retrieval
         }
         
         if metadata:
-            doc_metadata.update({
-                k: v for k, v in metadata.items() 
-                if v is not None and isinstance(v, (str, int, float, bool))
-            })
-        
-        self.collection.add(
-            documents=[searchable_doc],
-            metadatas=[doc_metadata],
-            ids=[doc_id]
-        )
+            doc_metadata.update(_clean_metadata(metadata))
         
-        return doc_id
+        return doc_id, searchable_doc, doc_metadata
     
     def search(
         self,
@@ -111,68 +327,167 @@ class ChromaMemory:
         Returns:
             List of matching content strings (original content, not searchable doc)
         """
+        key = (query, n_results)
+        cached = self._cached_search(key)
+        if cached is not None:
+            return cached
+        
         try:
+            generation = self._search_generation
+            self.flush()
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[self._embed_query(query)],
                 n_results=n_results,
                 include=["documents", "metadatas"]
             )
             
+            contents = []
             if results and results['metadatas'] and results['metadatas'][0]:
-                # Return original_content from metadata (clean, without label prefix)
-                return [
-                    meta.get('original_content', doc)
-                    for meta, doc in zip(results['metadatas'][0], results['documents'][0])
-                ]
-            return []
+                contents = _original_contents(results['metadatas'][0], results['documents'][0])
+            self._store_search(key, generation, contents)
+            return contents
             
         except Exception as e:
             print(f"Error searching memory: {e}")
             return []
     
-    def search_with_metadata(
+    def _cached_search(self, key: tuple) -> Optional[List[str]]:
+        """Fresh cached search() result for key, or None."""
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is None:
+                return None
+            stored_at, contents = entry
+            if time.monotonic() - stored_at > self.search_cache_ttl:
+                del self._search_cache[key]
+                return None
+            self._search_cache.move_to_end(key)
+            return list(contents)
+    
+    def _store_search(self, key: tuple, generation: int, contents: List[str]) -> None:
+        """Cache a search() result unless a write happened since generation."""
+        if self.search_cache_ttl <= 0:
+            return
+        with self._search_cache_lock:
+            if generation != self._search_generation:
+                return
+            self._search_cache[key] = (time.monotonic(), list(contents))
+            self._search_cache.move_to_end(key)
+            if len(self._search_cache) > 256:
+                self._search_cache.popitem(last=False)
+    
+    def _invalidate_searches(self) -> None:
+        """Drop cached search() results after a write."""
+        with self._search_cache_lock:
+            self._search_generation += 1
+            self._search_cache.clear()
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        n_results: int = 5
+    ) -> List[List[str]]:
+        """
+        Search memory for several queries in one Chroma call.
+        Uncached queries are embedded together in one model call and all
+        of them go to one vector search, instead of paying the per-call
+        overhead once per query.
+        
+        Args:
+            queries: Search queries
+            n_results: Number of results to return per query
+            
+        Returns:
+            One list of matching content strings per query, in order
+        """
+        if not queries:
+            return []
+        try:
+            self.flush()
+            results = self.collection.query(
+                query_embeddings=self._embed_queries(queries),
+                n_results=n_results,
+                include=["documents", "metadatas"]
+            )
+            
+            if not results or not results['metadatas']:
+                return [[] for _ in queries]
+            return [
+                _original_contents(metas or [], docs or [])
+                for metas, docs in zip(results['metadatas'], results['documents'])
+            ]
+            
+        except Exception as e:
+            print(f"Error searching memory: {e}")
+            return [[] for _ in queries]
+    
+    def search_columns(
         self,
         query: str,
         n_results: int = 5
-    ) -> List[Dict[str, Any]]:
+    ) -> Dict[str, Any]:
         """
-        Search memory and return results with metadata.
+        Search memory and return the results as columns.
         
         Args:
             query: Search query
             n_results: Number of results to return
             
         Returns:
-            List of dicts with 'content', 'metadata', 'id', 'distance'
+            Dict with 'contents', 'metadatas' and 'ids' lists and a float32
+            'distances' array, all in rank order (empty on no match)
         """
         try:
+            self.flush()
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[self._embed_query(query)],
                 n_results=n_results,
                 include=["documents", "metadatas", "distances"]
             )
             
-            if not results or not results['documents'][0]:
-                return []
-            
-            return [
-                {
-                    "content": doc,
-                    "metadata": meta,
-                    "id": doc_id,
-                    "distance": dist
+            if results and results['documents'][0]:
+                return {
+                    "contents": results['documents'][0],
+                    "metadatas": results['metadatas'][0],
+                    "ids": results['ids'][0],
+                    "distances": np.asarray(results['distances'][0], dtype=np.float32)
                 }
-                for doc, meta, doc_id, dist in zip(
-                    results['documents'][0],
-                    results['metadatas'][0],
-                    results['ids'][0],
-                    results['distances'][0]
-                )
-            ]
             
         except Exception as e:
             print(f"Error searching memory: {e}")
-            return []
+        
+        return {"contents": [], "metadatas": [], "ids": [], "distances": np.empty(0, dtype=np.float32)}
+    
+    def search_with_metadata(
+        self,
+        query: str,
+        n_results: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Search memory and return results with metadata.
+        
+        Args:
+            query: Search query
+            n_results: Number of results to return
+            
+        Returns:
+            List of dicts with 'content', 'metadata', 'id', 'distance'
+        """
+        columns = self.search_columns(query, n_results)
+        return [
+            {
+                "content": doc,
+                "metadata": meta,
+                "id": doc_id,
+                "distance": dist
+            }
+            for doc, meta, doc_id, dist in zip(
+                columns['contents'],
+                columns['metadatas'],
+                columns['ids'],
+                columns['distances'].tolist()
+            )
+        ]
     
     def delete(self, doc_id: str) -> bool:
         """
@@ -185,12 +500,33 @@ class ChromaMemory:
             True if successful
         """
         try:
+            self.flush()
+            self._invalidate_searches()
             self.collection.delete(ids=[doc_id])
             return True
         except Exception as e:
             print(f"Error deleting from memory: {e}")
             return False
     
+    def delete_many(self, doc_ids: List[str]) -> bool:
+        """
+        Delete several documents by ID in a single call.
+        
+        Args:
+            doc_ids: Document IDs to delete
+            
+        Returns:
+            True if successful
+        """
+        try:
+            self.flush()
+            self._invalidate_searches()
+            self.collection.delete(ids=list(doc_ids))
+            return True
+        except Exception as e:
+            print(f"Error deleting from memory: {e}")
+            return False
+    
     def delete_by_content(self, content: str) -> bool:
         """
         Delete documents matching the content.
@@ -202,13 +538,15 @@ class ChromaMemory:
             True if successful
         """
         try:
-            # Search for matching documents
-            results = self.search_with_metadata(content, n_results=10)
+            self.flush()
+            # Exact match on the stored original, found with a metadata
+            # filter rather than a vector search (the document itself may
+            # carry a "[label] " prefix)
+            results = self.collection.get(where={"original_content": content}, include=[])
             
-            # Delete exact matches
-            for result in results:
-                if result['content'] == content:
-                    self.delete(result['id'])
+            # Delete exact matches in one call
+            if results and results['ids']:
+                return self.delete_many(results['ids'])
             
             return True
         except Exception as e:
@@ -223,11 +561,17 @@ class ChromaMemory:
             True if successful
         """
         try:
-            # Delete and recreate collection
-            self.client.delete_collection("jarvis_memory")
-            self._collection = None
+            self._invalidate_searches()
+            # Buffered adds would be deleted anyway; drop them unwritten
+            with self._flush_lock:
+                with self._buffer_lock:
+                    self._buffer_ids, self._buffer_docs, self._buffer_metas = [], [], []
+                
+                # Delete and recreate collection
+                self.client.delete_collection("jarvis_memory")
+                self._collection = None
             # Immediate recreation to ensure readiness
-            self.get_or_create_collection()
+            self.collection
             return True
         except Exception as e:
             print(f"Error clearing memory: {e}")
@@ -241,42 +585,52 @@ class ChromaMemory:
             Number of stored documents
         """
         try:
+            self.flush()
             return self.collection.count()
         except Exception:
             return 0
     
-    def list_all(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def iter_all(self, page_size: int = 500) -> Iterator[Dict[str, Any]]:
         """
-        List all items in memory.
+        Stream every item in memory, one page of Chroma results at a time.
         
         Args:
-            limit: Maximum number of items to return
+            page_size: Number of items fetched per get() call
             
-        Returns:
-            List of all stored items with metadata
+        Yields:
+            Dicts with 'content', 'metadata', 'id'
         """
-        try:
+        self.flush()
+        offset = 0
+        while True:
             results = self.collection.get(
-                limit=limit,
+                limit=page_size,
+                offset=offset,
                 include=["documents", "metadatas"]
             )
+            if not results or not results['ids']:
+                return
             
-            if not results or not results['documents']:
-                return []
-            
-            return [
-                {
+            for doc, meta, doc_id in zip(results['documents'], results['metadatas'], results['ids']):
+                yield {
                     "content": doc,
                     "metadata": meta,
                     "id": doc_id
                 }
-                for doc, meta, doc_id in zip(
-                    results['documents'],
-                    results['metadatas'],
-                    results['ids']
-                )
-            ]
+            offset += len(results['ids'])
+    
+    def list_all(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        List all items in memory.
+        
+        Args:
+            limit: Maximum number of items to return
             
+        Returns:
+            List of all stored items with metadata
+        """
+        try:
+            return list(islice(self.iter_all(page_size=min(limit, 500)), limit))
         except Exception as e:
             print(f"Error listing memory: {e}")
             return []
@@ -300,6 +654,8 @@ def get_memory() -> Optional[ChromaMemory]:
     
     if _memory_instance is None:
         _memory_instance = ChromaMemory()
+        if config.WARM_MEMORY:
+            _memory_instance.warm_up()
     
     return _memory_instance
 
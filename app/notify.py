@@ -6,16 +6,74 @@ Provides robust notification functionality with sounds and Do-Not-Disturb bypass
 import subprocess
 import shutil
 import os
-from typing import Optional
+import queue
+import threading
+from functools import lru_cache
+from typing import Callable, Optional
 
 from app.config import config
 
 
+@lru_cache(maxsize=1)
 def is_terminal_notifier_available() -> bool:
     """Check if terminal-notifier is installed."""
     return shutil.which("terminal-notifier") is not None
 
 
+# Fixed JXA script for the osascript fallback; reads its text from the
+# JARVIS_NOTIFY_* environment variables set by _notify_osascript
+_JXA_NOTIFY_SCRIPT = """
+ObjC.import('Foundation');
+var env = $.NSProcessInfo.processInfo.environment;
+function arg(name) { return ObjC.unwrap(env.objectForKey(name)); }
+var app = Application.currentApplication();
+app.includeStandardAdditions = true;
+var options = {withTitle: arg('JARVIS_NOTIFY_TITLE')};
+var subtitle = arg('JARVIS_NOTIFY_SUBTITLE');
+if (subtitle) { options.subtitle = subtitle; }
+app.displayNotification(arg('JARVIS_NOTIFY_MESSAGE'), options);
+"""
+
+
+@lru_cache(maxsize=None)
+def _sound_path(sound: str) -> str:
+    """Path of a system sound, falling back to Glass if it doesn't exist."""
+    sound_file = f"/System/Library/Sounds/{sound}.aiff"
+    if not os.path.exists(sound_file):
+        sound_file = "/System/Library/Sounds/Glass.aiff"
+    return sound_file
+
+
+# Notifications are delivered by one background thread: terminal-notifier and
+# osascript block for tens to hundreds of ms, which callers shouldn't wait on
+_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+
+def _deliver_forever() -> None:
+    """Drain the notification queue in order."""
+    while True:
+        item = _queue.get()
+        if isinstance(item, threading.Event):
+            item.set()  # flush_notifications marker
+            continue
+        args, kwargs = item
+        try:
+            _notify_now(*args, **kwargs)
+        except Exception as e:
+            print(f"Notification error: {e}")
+
+
+def _ensure_worker() -> None:
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_deliver_forever, name="jarvis-notify", daemon=True)
+                _worker.start()
+
+
 def notify(
     message: str,
     title: Optional[str] = None,
@@ -23,61 +81,120 @@ def notify(
     sound: str = "Glass",
     group: Optional[str] = None,
     activate_url: Optional[str] = None
+) -> bool:
+    """
+    Queue a macOS notification and return immediately.
+    It is shown in order by the notifier thread (see _notify_now).
+    
+    Returns:
+        True once queued; delivery errors are printed by the notifier thread
+    """
+    _ensure_worker()
+    _queue.put(((message, title, subtitle, sound, group, activate_url), {}))
+    return True
+
+
+def flush_notifications(timeout: float = 5.0) -> bool:
+    """
+    Wait until every queued notification has been shown.
+    
+    Returns:
+        True if the queue drained within timeout
+    """
+    _ensure_worker()
+    done = threading.Event()
+    _queue.put(done)
+    return done.wait(timeout)
+
+
+def _notify_terminal_notifier(
+    message: str,
+    title: str,
+    subtitle: Optional[str],
+    group: Optional[str],
+    activate_url: Optional[str]
+) -> None:
+    """Show a notification with terminal-notifier (bypasses Do Not Disturb)."""
+    cmd = ["terminal-notifier", "-message", message, "-ignoreDnD"]
+    
+    if title:
+        cmd.extend(["-title", title])
+    
+    if subtitle:
+        cmd.extend(["-subtitle", subtitle])
+        
+    if group:
+        cmd.extend(["-group", group])
+        
+    if activate_url:
+        cmd.extend(["-open", activate_url])
+        
+    subprocess.run(cmd, check=True, capture_output=True)
+
+
+def _notify_osascript(
+    message: str,
+    title: str,
+    subtitle: Optional[str],
+    group: Optional[str],
+    activate_url: Optional[str]
+) -> None:
+    """Show a notification with osascript (respects Do Not Disturb; no group or URL)."""
+    # Text goes through the environment, never into the script source,
+    # so quotes, backslashes and newlines need no escaping
+    env = dict(os.environ)
+    env["JARVIS_NOTIFY_MESSAGE"] = message
+    env["JARVIS_NOTIFY_TITLE"] = title
+    if subtitle:
+        env["JARVIS_NOTIFY_SUBTITLE"] = subtitle
+    
+    subprocess.run(
+        ["osascript", "-l", "JavaScript", "-e", _JXA_NOTIFY_SCRIPT],
+        env=env, check=True, capture_output=True
+    )
+
+
+# Backend chosen on the first notification; only the notifier thread touches it
+_backend: Optional[Callable[..., None]] = None
+
+
+def _notify_now(
+    message: str,
+    title: Optional[str] = None,
+    subtitle: Optional[str] = None,
+    sound: str = "Glass",
+    group: Optional[str] = None,
+    activate_url: Optional[str] = None
 ) -> bool:
     """
     Show a macOS notification with audio.
-    Prioritizes terminal-notifier to bypass Do Not Disturb.
+    Prioritizes terminal-notifier to bypass Do Not Disturb, and switches to
+    osascript for good if it fails rather than retrying it on every call.
     Uses generic afplay for sound to ensure it's heard.
     """
-    # 1. Play sound directly (works even if notifications are blocked)
+    global _backend
+    
+    # Play sound directly (works even if notifications are blocked)
     if sound:
         try:
-            sound_file = f"/System/Library/Sounds/{sound}.aiff"
-            if not os.path.exists(sound_file):
-                sound_file = "/System/Library/Sounds/Glass.aiff"
-            subprocess.Popen(["afplay", sound_file], stderr=subprocess.DEVNULL)
+            subprocess.Popen(["afplay", _sound_path(sound)], stderr=subprocess.DEVNULL)
         except Exception:
             pass
-
-    # 2. Try terminal-notifier (bypasses Do Not Disturb)
-    if is_terminal_notifier_available():
-        try:
-            cmd = ["terminal-notifier", "-message", message, "-ignoreDnD"]
-            
-            if title or config.NOTIFICATION_TITLE:
-                cmd.extend(["-title", title or config.NOTIFICATION_TITLE])
-            
-            if subtitle:
-                cmd.extend(["-subtitle", subtitle])
-                
-            if group:
-                cmd.extend(["-group", group])
-                
-            if activate_url:
-                cmd.extend(["-open", activate_url])
-                
-            subprocess.run(cmd, check=True, capture_output=True)
-            return True
-        except Exception as e:
-            print(f"terminal-notifier failed: {e}")
-            # Fall through to osascript
-
-    # 3. Fallback to osascript (respects Do Not Disturb settings)
+    
+    if _backend is None:
+        _backend = _notify_terminal_notifier if is_terminal_notifier_available() else _notify_osascript
+    
     try:
-        title = title or config.NOTIFICATION_TITLE
-        msg = message.replace('"', '\\"')
-        ttl = title.replace('"', '\\"')
-        
-        script = f'display notification "{msg}" with title "{ttl}"'
-        if subtitle:
-            sub = subtitle.replace('"', '\\"')
-            script += f' subtitle "{sub}"'
-            
-        subprocess.run(["osascript", "-e", script], check=True, capture_output=True)
+        _backend(message, title or config.NOTIFICATION_TITLE, subtitle, group, activate_url)
         return True
     except Exception as e:
-        print(f"Notification error: {e}")
-        return False
+        if _backend is _notify_osascript:
+            print(f"Notification error: {e}")
+            return False
+        print(f"terminal-notifier failed, using osascript from now on: {e}")
+        _backend = _notify_osascript
+        # Sound was already played
+        return _notify_now(message, title, subtitle, None, group, activate_url)
 
 
 def notify_success(message: str, subtitle: Optional[str] = None) -> bool:
@@ -98,5 +215,6 @@ def notify_info(message: str, subtitle: Optional[str] = None) -> bool:
 if __name__ == "__main__":
     if is_terminal_notifier_available():
         notify_success("Jarvis is ready!", subtitle="Notifications configured")
+        flush_notifications()
     else:
         print("terminal-notifier not installed. Run: brew install terminal-notifier")
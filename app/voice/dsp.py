@@ -0,0 +1,83 @@
+"""
+Per-frame signal helpers for the voice pipeline.
+Uses a Numba-compiled kernel when numba is installed, NumPy otherwise.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _frame_rms_numpy(samples: np.ndarray) -> float:
+    if len(samples) == 0:
+        return 0.0
+    x = samples.astype(np.float32)
+    return float(np.sqrt(np.dot(x, x) / len(x)))
+
+
+def _float_to_pcm16_numpy(samples: np.ndarray, out: np.ndarray) -> None:
+    np.multiply(np.clip(samples, -1.0, 1.0), 32767, out=out, casting='unsafe')
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _frame_rms_jit(samples):
+        n = len(samples)
+        if n == 0:
+            return 0.0
+        acc = 0.0
+        for i in range(n):
+            v = float(samples[i])
+            acc += v * v
+        return np.sqrt(acc / n)
+
+    @njit(cache=True, fastmath=True)
+    def _float_to_pcm16_jit(samples, out):
+        # Scale, clip and truncate in one pass, with no temporaries
+        for i in range(len(samples)):
+            v = samples[i] * 32767.0
+            if v > 32767.0:
+                v = 32767.0
+            elif v < -32767.0:
+                v = -32767.0
+            out[i] = np.int16(v)
+
+    _frame_rms = _frame_rms_jit
+    _float_to_pcm16 = _float_to_pcm16_jit
+else:
+    _frame_rms = _frame_rms_numpy
+    _float_to_pcm16 = _float_to_pcm16_numpy
+
+
+def frame_rms(samples: np.ndarray) -> float:
+    """
+    Root-mean-square level of one frame of int16 PCM.
+
+    Args:
+        samples: int16 samples (e.g. np.frombuffer(frame, dtype=np.int16))
+
+    Returns:
+        RMS in sample units (0-32767)
+    """
+    return _frame_rms(samples)
+
+
+def float_to_pcm16(samples: np.ndarray, out: np.ndarray) -> None:
+    """
+    Convert float32 audio in [-1, 1] to int16 PCM, clipping out-of-range
+    samples and truncating like astype.
+
+    Args:
+        samples: float32 samples
+        out: int16 array of the same length, written in place
+    """
+    _float_to_pcm16(samples, out)
+
+
+def warm_up() -> None:
+    """Compile the JIT kernels now so the first real frame doesn't pay for them."""
+    frame_rms(np.zeros(1, dtype=np.int16))
+    float_to_pcm16(np.zeros(1, dtype=np.float32), np.zeros(1, dtype=np.int16))
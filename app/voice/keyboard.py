@@ -3,8 +3,12 @@ Keyboard listener for push-to-talk activation.
 Supports hotkey combinations and the special Fn key on macOS.
 """
 
+import queue
 import threading
-from typing import Callable, Optional, Set
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Optional
 from pynput import keyboard
 
 # Try to import Quartz for Fn key detection on macOS
@@ -14,6 +18,84 @@ try:
 except ImportError:
     HAS_QUARTZ = False
 
+# A hotkey press this soon after the hotkey was released is contact bounce
+# or a stray repeat, not a new push (nanoseconds)
+_DEBOUNCE_NS = 20_000_000
+
+# Print modifier+key combos from the push-to-talk listener (edit to enable)
+DEBUG_PTT = False
+
+# Modifier keys (left/right variants included) -> hotkey modifier name.
+# Built once at import instead of per PushToTalk instance
+_MODIFIER_NAMES = MappingProxyType({
+    keyboard.Key.cmd: "cmd",
+    keyboard.Key.cmd_l: "cmd",
+    keyboard.Key.cmd_r: "cmd",
+    keyboard.Key.ctrl: "ctrl",
+    keyboard.Key.ctrl_l: "ctrl",
+    keyboard.Key.ctrl_r: "ctrl",
+    keyboard.Key.alt: "alt",
+    keyboard.Key.alt_l: "alt",
+    keyboard.Key.alt_r: "alt",
+    keyboard.Key.shift: "shift",
+    keyboard.Key.shift_l: "shift",
+    keyboard.Key.shift_r: "shift",
+})
+
+# Modifier name -> bit in a per-name modifier mask
+_MODIFIER_BITS = MappingProxyType({"cmd": 1, "ctrl": 2, "alt": 4, "shift": 8})
+
+# Modifier key -> its own bit in PushToTalk's held-key mask, so releasing
+# cmd_r doesn't clear cmd while cmd_l is still down. The bare, _l and _r
+# keys of a name use its name bit shifted by 0, 4 and 8
+_MODIFIER_KEY_BITS = MappingProxyType({
+    key: _MODIFIER_BITS[name] << 4 * ("", "_l", "_r").index(key.name[len(name):])
+    for key, name in _MODIFIER_NAMES.items()
+})
+
+
+def _fold_modifiers(key_mask: int) -> int:
+    """Collapse a held-key mask to one bit per modifier name."""
+    return (key_mask | key_mask >> 4 | key_mask >> 8) & 0xF
+
+# Hotkey string tokens: modifier spellings -> canonical name, and F-keys
+_HOTKEY_MODIFIERS = MappingProxyType({
+    "cmd": "cmd", "ctrl": "ctrl", "alt": "alt", "shift": "shift", "option": "alt"
+})
+_FKEYS = MappingProxyType({f"f{i}": getattr(keyboard.Key, f"f{i}") for i in range(1, 13)})
+
+
+@lru_cache(maxsize=None)
+def _parse_hotkey(hotkey: str):
+    """Parse a hotkey string into modifiers and trigger key."""
+    parts = [p.strip().lower() for p in hotkey.split("+")]
+    
+    modifiers = set()
+    trigger = None
+    
+    for part in parts:
+        if part in _HOTKEY_MODIFIERS:
+            modifiers.add(_HOTKEY_MODIFIERS[part])
+        elif part in _FKEYS:
+            trigger = _FKEYS[part]
+        elif len(part) == 1:
+            trigger = part
+        else:
+            print(f"⚠️  Unknown key: {part}")
+    
+    if trigger is None:
+        trigger = "j"
+    
+    return frozenset(modifiers), trigger
+
+
+@lru_cache(maxsize=256)
+def _key_to_string(key) -> str:
+    """Convert a key to readable string (memoized; keys repeat constantly)."""
+    if isinstance(key, keyboard.KeyCode):
+        return key.char if key.char else str(key)
+    return str(key).replace("Key.", "")
+
 
 class FnKeyDetector:
     """
@@ -31,13 +113,22 @@ class FnKeyDetector:
         self.is_active = False
         self._running = False
         self._thread = None
+        # The listener thread's CFRunLoop, so stop() can end CFRunLoopRun
+        self._run_loop_ref = None
+        self._last_flags = 0
     
     def _event_callback(self, proxy, event_type, event, refcon):
         """Callback for Quartz event tap."""
         # Get current modifier flags
         flags = Quartz.CGEventGetFlags(event)
         
-        # Check for Fn key (flag 0x800000 = 8388608)
+        # Every modifier fires flagsChanged; return early unless the Fn bit
+        # (0x800000 = 8388608) is the one that toggled
+        changed = flags ^ self._last_flags
+        self._last_flags = flags
+        if not changed & 0x800000:
+            return event
+        
         fn_pressed = bool(flags & 0x800000)
         
         if fn_pressed and not self.is_active:
@@ -69,8 +160,9 @@ class FnKeyDetector:
         
         # Create run loop source
         run_loop_source = Quartz.CFMachPortCreateRunLoopSource(None, tap, 0)
+        self._run_loop_ref = Quartz.CFRunLoopGetCurrent()
         Quartz.CFRunLoopAddSource(
-            Quartz.CFRunLoopGetCurrent(),
+            self._run_loop_ref,
             run_loop_source,
             Quartz.kCFRunLoopCommonModes
         )
@@ -80,9 +172,10 @@ class FnKeyDetector:
         
         print("Push-to-talk: Hold [FN] to speak")
         
-        # Run the loop
-        while self._running:
-            Quartz.CFRunLoopRunInMode(Quartz.kCFRunLoopDefaultMode, 0.1, False)
+        # Sleep in the run loop until an event arrives or stop() ends it,
+        # instead of waking every 100 ms to poll _running
+        if self._running:
+            Quartz.CFRunLoopRun()
     
     def start(self):
         """Start listening for Fn key."""
@@ -97,6 +190,8 @@ class FnKeyDetector:
     def stop(self):
         """Stop listening."""
         self._running = False
+        if self._run_loop_ref is not None:
+            Quartz.CFRunLoopStop(self._run_loop_ref)
         if self._thread:
             self._thread.join(timeout=1)
 
@@ -120,140 +215,104 @@ class PushToTalk:
         self.hotkey_str = hotkey.lower()
         self.is_active = False
         self.listener = None
-        self._lock = threading.Lock()
-        self._debug = False
+        # is_active is only written from the pynput listener thread (both
+        # callbacks run there), so no lock is needed around it
+        
+        # on_activate/on_deactivate run in order on their own thread: a slow
+        # callback on the listener (or event tap) thread stalls input system-wide
+        self._callbacks: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._callback_thread = threading.Thread(target=self._run_callbacks, name="ptt-callbacks", daemon=True)
+        self._callback_thread.start()
         
         # Check if using Fn key
         self._use_fn = (hotkey.lower() == "fn")
         
         if self._use_fn:
             self._fn_detector = FnKeyDetector(
-                on_activate=on_activate,
-                on_deactivate=on_deactivate
+                on_activate=self._fire_activate,
+                on_deactivate=self._fire_deactivate
             )
         else:
             self._fn_detector = None
-            # Currently pressed keys
-            self._pressed_keys: Set = set()
             # Parse the hotkey
-            self._required_modifiers, self._trigger_key = self._parse_hotkey(hotkey)
-        
-        # Modifier key mappings
-        self._modifier_map = {
-            keyboard.Key.cmd: "cmd",
-            keyboard.Key.cmd_l: "cmd",
-            keyboard.Key.cmd_r: "cmd",
-            keyboard.Key.ctrl: "ctrl",
-            keyboard.Key.ctrl_l: "ctrl",
-            keyboard.Key.ctrl_r: "ctrl",
-            keyboard.Key.alt: "alt",
-            keyboard.Key.alt_l: "alt",
-            keyboard.Key.alt_r: "alt",
-            keyboard.Key.shift: "shift",
-            keyboard.Key.shift_l: "shift",
-            keyboard.Key.shift_r: "shift",
-        }
-    
-    def _parse_hotkey(self, hotkey: str):
-        """Parse a hotkey string into modifiers and trigger key."""
-        parts = [p.strip().lower() for p in hotkey.split("+")]
-        
-        modifiers = set()
-        trigger = None
-        
-        modifier_names = {"cmd", "ctrl", "alt", "shift", "option"}
-        fkey_map = {f"f{i}": getattr(keyboard.Key, f"f{i}") for i in range(1, 13)}
-        
-        for part in parts:
-            if part in modifier_names:
-                if part == "option":
-                    modifiers.add("alt")
-                else:
-                    modifiers.add(part)
-            elif part in fkey_map:
-                trigger = fkey_map[part]
-            elif len(part) == 1:
-                trigger = part
+            self._required_modifiers, self._trigger_key = _parse_hotkey(hotkey)
+            # Held modifier keys as a bitmask (see _MODIFIER_KEY_BITS), updated
+            # as keys go down and up, so a key event compares ints instead of
+            # building a set
+            self._mod_state = 0
+            self._required_mod_mask = sum(_MODIFIER_BITS[m] for m in self._required_modifiers)
+            self._last_release_ns = 0
+            # Everything a trigger event can resolve to in _is_trigger: the
+            # Key member itself, or the character in either case. Chars are
+            # compared rather than KeyCode objects, because KeyCodes from the
+            # listener carry a vk that KeyCode.from_char() lacks
+            if isinstance(self._trigger_key, keyboard.Key):
+                self._trigger_ids = frozenset({self._trigger_key})
             else:
-                print(f"⚠️  Unknown key: {part}")
-        
-        if trigger is None:
-            trigger = "j"
-        
-        return modifiers, trigger
+                self._trigger_ids = frozenset({self._trigger_key, self._trigger_key.upper()})
     
-    def _get_current_modifiers(self) -> Set[str]:
-        """Get set of currently pressed modifier names."""
-        modifiers = set()
-        for key in self._pressed_keys:
-            if key in self._modifier_map:
-                modifiers.add(self._modifier_map[key])
-        return modifiers
+    def _is_trigger(self, key) -> bool:
+        """Check if key is the hotkey's trigger key (ignoring modifiers)."""
+        # KeyCode -> its char; Key members have no char and match themselves
+        return getattr(key, "char", key) in self._trigger_ids
     
-    def _check_hotkey_match(self, key) -> bool:
-        """Check if current key + modifiers match the hotkey."""
-        trigger_match = False
-        
-        if isinstance(self._trigger_key, keyboard.Key):
-            trigger_match = (key == self._trigger_key)
-        elif isinstance(key, keyboard.KeyCode) and key.char:
-            trigger_match = (key.char.lower() == self._trigger_key)
-        
-        if not trigger_match:
-            return False
-        
-        current_mods = self._get_current_modifiers()
-        return current_mods == self._required_modifiers
+    def _run_callbacks(self):
+        """Run queued activate/deactivate callbacks off the listener thread."""
+        while True:
+            callback = self._callbacks.get()
+            try:
+                callback()
+            except Exception as e:
+                print(f"Push-to-talk callback error: {e}")
+    
+    def _fire_activate(self):
+        if self.on_activate:
+            self._callbacks.put(self.on_activate)
+    
+    def _fire_deactivate(self):
+        if self.on_deactivate:
+            self._callbacks.put(self.on_deactivate)
     
     def _on_press(self, key):
         """Handle key press."""
-        self._pressed_keys.add(key)
+        # Runs for every key typed anywhere, so the state is read into a
+        # local once and the hotkey check is inlined (no method call)
+        mod_state = self._mod_state | _MODIFIER_KEY_BITS.get(key, 0)
+        self._mod_state = mod_state
         
-        if self._debug:
-            mods = self._get_current_modifiers()
-            key_str = self._key_to_string(key)
-            if mods:
-                print(f"[DEBUG] Pressed: {'+'.join(sorted(mods))}+{key_str}")
+        if DEBUG_PTT and mod_state:
+            # _MODIFIER_BITS is already in cmd, ctrl, alt, shift order
+            held = _fold_modifiers(mod_state)
+            mods = '+'.join(name for name, bit in _MODIFIER_BITS.items() if held & bit)
+            print(f"[DEBUG] Pressed: {mods}+{_key_to_string(key)}")
         
-        try:
-            if self._check_hotkey_match(key):
-                with self._lock:
-                    if not self.is_active:
-                        self.is_active = True
-                        if self.on_activate:
-                            self.on_activate()
-        except Exception as e:
-            print(f"Key press error: {e}")
+        # Nothing here can raise: the match is int arithmetic and a set
+        # lookup, and user callbacks run (and report errors) on the callback
+        # thread. The modifier check goes first since it rejects most keys
+        if (
+            ((mod_state | mod_state >> 4 | mod_state >> 8) & 0xF) == self._required_mod_mask
+            and not self.is_active
+            and getattr(key, "char", key) in self._trigger_ids
+            and time.monotonic_ns() - self._last_release_ns >= _DEBOUNCE_NS
+        ):
+            self.is_active = True
+            self._fire_activate()
     
     def _on_release(self, key):
         """Handle key release."""
-        self._pressed_keys.discard(key)
+        bit = _MODIFIER_KEY_BITS.get(key, 0)
+        if bit:
+            self._mod_state &= ~bit
         
-        if self.is_active:
-            trigger_released = False
-            if isinstance(self._trigger_key, keyboard.Key):
-                trigger_released = (key == self._trigger_key)
-            elif isinstance(key, keyboard.KeyCode) and key.char:
-                trigger_released = (key.char.lower() == self._trigger_key)
-            
-            modifier_released = False
-            if key in self._modifier_map:
-                mod_name = self._modifier_map[key]
-                if mod_name in self._required_modifiers:
-                    modifier_released = True
-            
-            if trigger_released or modifier_released:
-                with self._lock:
-                    if self.is_active:
-                        self.is_active = False
-                        if self.on_deactivate:
-                            self.on_deactivate()
-    
-    def _key_to_string(self, key) -> str:
-        """Convert a key to readable string."""
-        if isinstance(key, keyboard.KeyCode):
-            return key.char if key.char else str(key)
-        return str(key).replace("Key.", "")
+        # Ordinary typing: nothing to deactivate
+        if not self.is_active:
+            return
+        
+        if _fold_modifiers(bit) & self._required_mod_mask or self._is_trigger(key):
+            self.is_active = False
+            # Releases are never debounced, so recording can't get stuck on
+            self._last_release_ns = time.monotonic_ns()
+            self._fire_deactivate()
     
     def start(self):
         """Start listening for keyboard events."""
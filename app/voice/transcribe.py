@@ -2,12 +2,28 @@
 Transcription using Groq Whisper API.
 """
 
-import io
-from typing import Optional
+import asyncio
+import mimetypes
+import os
+from typing import BinaryIO, List, Optional, Tuple, Union
 
 from app.config import config
 
 
+def _transcribe(file: Tuple[str, Union[bytes, BinaryIO], str]) -> str:
+    """Send one (filename, content, content_type) upload to Whisper on the shared Groq client."""
+    from app.llm.providers import get_raw_groq_client
+    
+    # One client for the whole process, so repeat uploads reuse its
+    # keep-alive connection instead of a new TCP/TLS handshake
+    response = get_raw_groq_client().audio.transcriptions.create(
+        model=config.GROQ_WHISPER_MODEL,
+        file=file,
+        language="en"
+    )
+    return response.text
+
+
 def transcribe_audio(audio_bytes: bytes) -> Optional[str]:
     """
     Transcribe audio bytes to text using Groq Whisper.
@@ -19,21 +35,9 @@ def transcribe_audio(audio_bytes: bytes) -> Optional[str]:
         Transcribed text, or None on failure
     """
     try:
-        from groq import Groq
-        
-        client = Groq(api_key=config.GROQ_API_KEY)
-        
-        audio_file = io.BytesIO(audio_bytes)
-        audio_file.name = "audio.wav"
-        
-        response = client.audio.transcriptions.create(
-            model=config.GROQ_WHISPER_MODEL,
-            file=audio_file,
-            language="en"
-        )
-        
-        return response.text
-        
+        # Hand the bytes over as-is; the SDK reads file objects fully into
+        # memory anyway, so a (spooled) file would only add a copy
+        return _transcribe(("audio.wav", audio_bytes, "audio/wav"))
     except Exception as e:
         print(f"Error transcribing audio: {e}")
         return None
@@ -50,9 +54,57 @@ def transcribe_audio_file(file_path: str) -> Optional[str]:
         Transcribed text, or None on failure
     """
     try:
+        # Pass the open file straight to the SDK, under its real name so
+        # the API sees the right format (not every file is a WAV)
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
         with open(file_path, "rb") as f:
-            audio_bytes = f.read()
-        return transcribe_audio(audio_bytes)
-    except Exception as e:
+            return _transcribe((os.path.basename(file_path), f, content_type))
+    except OSError as e:
         print(f"Error reading audio file: {e}")
         return None
+    except Exception as e:
+        print(f"Error transcribing audio: {e}")
+        return None
+
+
+def transcribe_audio_files(file_paths: List[str], max_concurrency: int = 5) -> List[Optional[str]]:
+    """
+    Transcribe several audio files concurrently.
+    
+    Args:
+        file_paths: Paths to the audio files
+        max_concurrency: Maximum number of in-flight uploads
+        
+    Returns:
+        Transcribed text per file in input order; None for failures
+    """
+    async def run_all() -> List[Optional[str]]:
+        from groq import AsyncGroq
+        
+        # Async connections belong to the loop asyncio.run creates below,
+        # so each batch gets its own client rather than the shared one
+        async with AsyncGroq(api_key=config.GROQ_API_KEY) as client:
+            sem = asyncio.Semaphore(max_concurrency)
+            
+            async def one(file_path: str) -> Optional[str]:
+                async with sem:
+                    try:
+                        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+                        with open(file_path, "rb") as f:
+                            response = await client.audio.transcriptions.create(
+                                model=config.GROQ_WHISPER_MODEL,
+                                file=(os.path.basename(file_path), f.read(), content_type),
+                                language="en"
+                            )
+                        return response.text
+                    except Exception as e:
+                        print(f"Error transcribing {file_path}: {e}")
+                        return None
+            
+            return await asyncio.gather(*[one(path) for path in file_paths])
+    
+    try:
+        return asyncio.run(run_all())
+    except Exception as e:
+        print(f"Error in transcribe_audio_files: {e}")
+        return [None] * len(file_paths)
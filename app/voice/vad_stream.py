@@ -3,14 +3,21 @@ Voice Activity Detection using WebRTC VAD.
 Detects when speech starts and ends in audio stream.
 """
 
-import io
-import wave
+import struct
 import collections
-from typing import Optional, Callable, List
+import queue
+import threading
+from typing import Optional, Callable, List, Tuple, Union
 
 import numpy as np
 import webrtcvad
 
+from app.voice import dsp
+
+
+# RIFF/WAVE header for mono 16-bit PCM (see audio_bytes_to_wav)
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
 
 class VADStream:
     """
@@ -24,7 +31,9 @@ class VADStream:
         frame_duration_ms: int = 30,
         aggressiveness: int = 2,
         padding_duration_ms: int = 300,
-        speech_threshold: float = 0.8
+        speech_threshold: float = 0.8,
+        min_rms: float = 50.0,
+        max_segment_ms: int = 15000
     ):
         """
         Initialize VAD stream.
@@ -35,67 +44,144 @@ class VADStream:
             aggressiveness: VAD aggressiveness (0-3, higher = more aggressive filtering)
             padding_duration_ms: Padding to add before/after speech
             speech_threshold: Threshold for speech detection (0-1)
+            min_rms: Frames quieter than this RMS (int16 units, ~-56 dBFS by
+                default) are treated as silence without calling webrtcvad;
+                0 disables the gate
+            max_segment_ms: Speech longer than this is cut and returned
+                as a segment even without a pause; 0 disables the cap
         """
         self.sample_rate = sample_rate
         self.frame_duration_ms = frame_duration_ms
         self.frame_size = int(sample_rate * frame_duration_ms / 1000)
         self.padding_duration_ms = padding_duration_ms
         self.speech_threshold = speech_threshold
+        self.min_rms = min_rms
+        self.max_segment_ms = max_segment_ms
+        # Byte length of a max_segment_ms segment of 16-bit mono PCM
+        self._max_segment_bytes = max_segment_ms * sample_rate // 1000 * 2
         
         # Number of frames for padding
         self.num_padding_frames = int(padding_duration_ms / frame_duration_ms)
         
         # Initialize VAD
         self.vad = webrtcvad.Vad(aggressiveness)
+        if min_rms:
+            dsp.warm_up()
         
-        # Ring buffer for padding
+        # Ring buffer of padding frames. Their speech flags are packed into
+        # an int (newest in bit 0) next to a running count of the set bits,
+        # so each frame is O(1) and allocates no per-frame tuple
         self.ring_buffer = collections.deque(maxlen=self.num_padding_frames)
+        self._speech_flags = 0
+        # With padding shorter than a frame the window is empty: every
+        # mask is 0, so no flag is ever kept or counted
+        self._window_mask = (1 << self.num_padding_frames) - 1
+        self._oldest_flag_bit = max(self.num_padding_frames - 1, 0)
+        self._newer_flags_mask = self._window_mask >> 1
+        self._voiced_count = 0
+        # Voiced (or, once triggered, unvoiced) frames in the window must
+        # exceed this; int() is exact because the counts are integers
+        self._trigger_count = int(self.speech_threshold * self.num_padding_frames)
         
         # State
         self.triggered = False
-        self.voiced_frames: List[bytes] = []
+        # PCM of the current speech segment, appended frame by frame
+        self.voiced_audio = bytearray()
     
-    def process_frame(self, frame: bytes) -> Optional[bytes]:
+    def process_frame(self, frame: Union[bytes, memoryview]) -> Optional[bytes]:
         """
         Process a single audio frame.
         
         Args:
-            frame: Raw audio frame bytes (16-bit PCM)
+            frame: Raw audio frame (16-bit PCM), as bytes or a read-only
+                   memoryview; views are held in the padding buffer, so
+                   the memory behind them must not change
             
         Returns:
             Complete speech segment if speech ended, None otherwise
         """
-        is_speech = self.vad.is_speech(frame, self.sample_rate)
+        # Cheap energy gate first; only frames with some signal reach webrtcvad
+        if self.min_rms and dsp.frame_rms(np.frombuffer(frame, dtype=np.int16)) < self.min_rms:
+            is_speech = False
+        else:
+            is_speech = self.vad.is_speech(frame, self.sample_rate)
+        
+        ring_buffer = self.ring_buffer
+        flags = self._speech_flags
+        if len(ring_buffer) == ring_buffer.maxlen:
+            # The oldest flag leaves with the frame append pushes out
+            self._voiced_count -= flags >> self._oldest_flag_bit
+            flags &= self._newer_flags_mask
+        ring_buffer.append(frame)
+        in_window = is_speech & self._window_mask
+        self._speech_flags = (flags << 1) | in_window
+        self._voiced_count += in_window
         
         if not self.triggered:
-            self.ring_buffer.append((frame, is_speech))
-            
-            num_voiced = sum(1 for f, speech in self.ring_buffer if speech)
-            
-            if num_voiced > self.speech_threshold * self.ring_buffer.maxlen:
+            if self._voiced_count > self._trigger_count:
                 self.triggered = True
-                self.voiced_frames = [f for f, s in self.ring_buffer]
-                self.ring_buffer.clear()
+                for f in ring_buffer:
+                    self.voiced_audio += f
+                ring_buffer.clear()
+                self._speech_flags = 0
+                self._voiced_count = 0
         else:
-            self.voiced_frames.append(frame)
-            self.ring_buffer.append((frame, is_speech))
+            self.voiced_audio += frame
             
-            num_unvoiced = sum(1 for f, speech in self.ring_buffer if not speech)
-            
-            if num_unvoiced > self.speech_threshold * self.ring_buffer.maxlen:
-                self.triggered = False
-                speech_data = b''.join(self.voiced_frames)
-                self.voiced_frames = []
-                self.ring_buffer.clear()
-                return speech_data
+            if len(ring_buffer) - self._voiced_count > self._trigger_count:
+                return self._finish_segment()
+            # Bound memory and transcription latency on continuous speech
+            if self._max_segment_bytes and len(self.voiced_audio) >= self._max_segment_bytes:
+                return self._finish_segment()
         
         return None
     
+    def process_pcm(self, pcm: bytes) -> List[Tuple[int, int]]:
+        """
+        Find the speech segments in a whole PCM recording, as fast as the
+        VAD can run rather than in real time.
+        
+        Args:
+            pcm: Raw 16-bit mono PCM at this stream's sample rate; a
+                 trailing partial frame is ignored
+            
+        Returns:
+            List of (start_ms, end_ms) speech segments
+        """
+        self.reset()
+        frame_bytes = self.frame_size * 2
+        n_frames = len(pcm) // frame_bytes
+        view = memoryview(pcm)
+        segments = []
+        
+        for i in range(n_frames):
+            start = i * frame_bytes
+            speech_data = self.process_frame(view[start:start + frame_bytes])
+            if speech_data is not None:
+                end = i + 1
+                segments.append((end - len(speech_data) // frame_bytes, end))
+        
+        # Speech still going at the end of the recording
+        if self.triggered:
+            segments.append((n_frames - len(self.voiced_audio) // frame_bytes, n_frames))
+        self.reset()
+        
+        ms = self.frame_duration_ms
+        return [(start * ms, end * ms) for start, end in segments]
+    
+    def _finish_segment(self) -> bytes:
+        """Return the buffered segment and go back to waiting for speech."""
+        speech_data = bytes(self.voiced_audio)
+        self.reset()
+        return speech_data
+    
     def reset(self):
         """Reset the VAD state."""
         self.triggered = False
-        self.voiced_frames = []
+        self.voiced_audio.clear()
         self.ring_buffer.clear()
+        self._speech_flags = 0
+        self._voiced_count = 0
 
 
 def audio_bytes_to_wav(audio_bytes: bytes, sample_rate: int = 16000) -> bytes:
@@ -109,20 +195,21 @@ def audio_bytes_to_wav(audio_bytes: bytes, sample_rate: int = 16000) -> bytes:
     Returns:
         WAV file bytes
     """
-    buffer = io.BytesIO()
-    with wave.open(buffer, 'wb') as wav:
-        wav.setnchannels(1)
-        wav.setsampwidth(2)  # 16-bit
-        wav.setframerate(sample_rate)
-        wav.writeframes(audio_bytes)
-    
-    return buffer.getvalue()
+    # Header packed directly (matches the wave module's output) so the PCM
+    # is copied once instead of through a BytesIO and back
+    header = _WAV_HEADER.pack(
+        b'RIFF', 36 + len(audio_bytes), b'WAVE',
+        b'fmt ', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b'data', len(audio_bytes)
+    )
+    return header + audio_bytes
 
 
 def create_audio_stream(
     sample_rate: int = 16000,
     frame_duration_ms: int = 30,
-    on_speech_end: Optional[Callable[[bytes], None]] = None
+    on_speech_end: Optional[Callable[..., None]] = None,
+    wav: bool = True
 ):
     """
     Create an audio stream with VAD processing.
@@ -131,37 +218,83 @@ def create_audio_stream(
         sample_rate: Audio sample rate
         frame_duration_ms: Frame duration in ms
         on_speech_end: Callback when speech segment ends
+        wav: If True, on_speech_end(wav_bytes) gets a WAV file; if False,
+             on_speech_end(pcm_bytes, sample_rate) gets the raw 16-bit
+             mono PCM, for consumers that decode it themselves (e.g.
+             np.frombuffer(pcm_bytes, dtype=np.int16))
         
     Returns:
         Tuple of (audio_callback, vad_stream)
+        
+    The callback accepts float32 or int16 input; open the stream with
+    dtype='int16' to let PortAudio deliver PCM and skip the conversion.
+    It only assembles frames: VAD, WAV encoding and on_speech_end run on
+    a worker thread, so slow callbacks can't cause audio dropouts.
     """
     import sounddevice as sd
     
     vad = VADStream(sample_rate=sample_rate, frame_duration_ms=frame_duration_ms)
     frame_size = int(sample_rate * frame_duration_ms / 1000)
+    frame_bytes = frame_size * 2
+    
+    # Preallocated staging frame: samples are converted straight into it and
+    # a partial frame carries over to the next callback, so the realtime
+    # callback never grows or re-slices a bytes buffer
+    frame = np.empty(frame_size, dtype=np.int16)
+    filled = 0
+    
+    # Complete frames go to the VAD worker, one or several per chunk;
+    # SimpleQueue.put never blocks
+    frame_queue: "queue.SimpleQueue[bytes]" = queue.SimpleQueue()
     
-    buffer = b''
+    def vad_worker():
+        while True:
+            # Frames are zero-copy views; the immutable chunk stays alive
+            # for as long as the padding buffer references it
+            chunk = memoryview(frame_queue.get())
+            for start in range(0, len(chunk), frame_bytes):
+                speech_data = vad.process_frame(chunk[start:start + frame_bytes])
+                if speech_data and on_speech_end:
+                    try:
+                        if wav:
+                            on_speech_end(audio_bytes_to_wav(speech_data, sample_rate))
+                        else:
+                            on_speech_end(speech_data, sample_rate)
+                    except Exception as e:
+                        print(f"Speech callback error: {e}")
+    
+    threading.Thread(target=vad_worker, name="vad-worker", daemon=True).start()
     
     def audio_callback(indata, frames, time, status):
-        nonlocal buffer
+        nonlocal filled
         
         if status:
             print(f"Audio status: {status}")
         
-        # Convert float32 to int16
-        audio_int16 = (indata * 32767).astype(np.int16)
-        buffer += audio_int16.tobytes()
-        
-        # Process complete frames
-        frame_bytes = frame_size * 2  # 16-bit = 2 bytes per sample
-        while len(buffer) >= frame_bytes:
-            frame = buffer[:frame_bytes]
-            buffer = buffer[frame_bytes:]
+        samples = indata[:, 0]
+        is_int16 = samples.dtype == np.int16
+        pos = 0
+        while pos < frames:
+            if is_int16 and filled == 0 and frames - pos >= frame_size:
+                # Whole int16 frames skip the staging frame and go to the
+                # worker as one chunk: one copy and one put per callback
+                end = pos + (frames - pos) // frame_size * frame_size
+                frame_queue.put(samples[pos:end].tobytes())
+                pos = end
+                continue
+            
+            take = min(frame_size - filled, frames - pos)
+            if is_int16:
+                frame[filled:filled + take] = samples[pos:pos + take]
+            else:
+                dsp.float_to_pcm16(samples[pos:pos + take], frame[filled:filled + take])
+            filled += take
+            pos += take
             
-            speech_data = vad.process_frame(frame)
-            if speech_data and on_speech_end:
-                wav_data = audio_bytes_to_wav(speech_data, sample_rate)
-                on_speech_end(wav_data)
+            # Hand complete frames to the worker
+            if filled == frame_size:
+                filled = 0
+                frame_queue.put(frame.tobytes())
     
     return audio_callback, vad
 
@@ -1,14 +1,32 @@
 """
 Wakeword detection for Jarvis.
 Simple keyword-based detection from transcripts.
+
+All helpers are pure functions of the transcript (and fixed config), so
+results are memoized for repeated commands.
 """
 
 import re
+from functools import lru_cache
 from typing import Tuple, Optional
 
 from app.config import config
 
 
+@lru_cache(maxsize=1)
+def _wakeword_pattern() -> "re.Pattern[str]":
+    """
+    One anchored regex for "jarvis, <command>", "hey jarvis <command>",
+    "ok jarvis <command>" and "jarvis<command>", compiled once for the
+    configured wakeword. The command group is empty for a bare wakeword.
+    Case-insensitive and tolerant of leading whitespace, so transcripts
+    are matched as-is without a lowered or stripped copy.
+    """
+    wakeword = re.escape(config.WAKEWORD)
+    return re.compile(rf"\s*(?:hey\s+|ok\s+)?{wakeword}[\s,]*(.*)$", re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=256)
 def detect_wakeword(transcript: str) -> Tuple[bool, Optional[str]]:
     """
     Detect wakeword in transcript and extract the command.
@@ -19,35 +37,32 @@ def detect_wakeword(transcript: str) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (wakeword_detected: bool, command: str or None)
     """
-    transcript_lower = transcript.lower().strip()
-    wakeword = config.WAKEWORD.lower()
-    
-    # Check if transcript starts with or contains the wakeword
     # Pattern: "jarvis, <command>" or "hey jarvis, <command>" or just "jarvis <command>"
-    patterns = [
-        rf"^hey\s+{wakeword}[\s,]+(.+)$",
-        rf"^{wakeword}[\s,]+(.+)$",
-        rf"^ok\s+{wakeword}[\s,]+(.+)$",
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, transcript_lower)
-        if match:
-            command = match.group(1).strip()
-            return True, command
-    
-    # Check if just the wakeword was spoken (might be followed by more speech)
-    if transcript_lower.startswith(wakeword):
-        # Remove the wakeword and return the rest
-        command = transcript_lower[len(wakeword):].strip()
-        if command.startswith(","):
-            command = command[1:].strip()
-        if command:
-            return True, command
+    match = _wakeword_pattern().match(transcript)
+    command = match.group(1).strip() if match else ""
     
+    # A wakeword with nothing after it is not a command
+    if command:
+        return True, command
     return False, None
 
 
+_STOP_PHRASES = frozenset({
+    "stop",
+    "exit",
+    "quit",
+    "goodbye",
+    "bye",
+    "shut down",
+    "shutdown",
+    "go away",
+    "nevermind",
+    "never mind",
+    "cancel"
+})
+
+
+@lru_cache(maxsize=256)
 def is_stop_command(command: str) -> bool:
     """
     Check if the command is a stop/exit command.
@@ -58,24 +73,16 @@ def is_stop_command(command: str) -> bool:
     Returns:
         True if it's a stop command
     """
-    stop_phrases = [
-        "stop",
-        "exit",
-        "quit",
-        "goodbye",
-        "bye",
-        "shut down",
-        "shutdown",
-        "go away",
-        "nevermind",
-        "never mind",
-        "cancel"
-    ]
-    
-    command_lower = command.lower().strip()
-    return command_lower in stop_phrases
+    return command.lower().strip() in _STOP_PHRASES
 
 
+# Any run of leading filler words, each followed by optional spaces/commas.
+# Whole words only, so "umbrella" or "likely" are left alone
+_FILLERS = r"(?:(?:please|can\s+you|could\s+you|would\s+you|uh|um|like)\b[\s,]*)"
+_FILLERS_RE = re.compile(rf"^{_FILLERS}+", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
 def normalize_command(command: str) -> str:
     """
     Normalize a command for processing.
@@ -88,17 +95,43 @@ def normalize_command(command: str) -> str:
         Normalized command
     """
     # Remove common filler words at the start
-    fillers = ["please", "can you", "could you", "would you", "uh", "um", "like"]
-    
-    command = command.strip()
-    
-    for filler in fillers:
-        if command.lower().startswith(filler):
-            command = command[len(filler):].strip()
-            if command.startswith(","):
-                command = command[1:].strip()
+    command = _FILLERS_RE.sub("", command.strip(), count=1)
     
     # Normalize whitespace
     command = " ".join(command.split())
     
     return command
+
+
+@lru_cache(maxsize=1)
+def _utterance_pattern() -> "re.Pattern[str]":
+    """
+    The wakeword pattern with the leading fillers and surrounding
+    whitespace folded in, so one match yields a cleaned-up command.
+    """
+    wakeword = re.escape(config.WAKEWORD)
+    return re.compile(
+        rf"\s*(?:hey\s+|ok\s+)?{wakeword}[\s,]*{_FILLERS}*(.*?)\s*$",
+        re.IGNORECASE | re.DOTALL
+    )
+
+
+@lru_cache(maxsize=256)
+def parse_utterance(transcript: str) -> Optional[str]:
+    """
+    Detect the wakeword and normalize the command in a single pass.
+    Same result as normalize_command on detect_wakeword's command.
+    
+    Args:
+        transcript: Transcribed speech text
+        
+    Returns:
+        Normalized command, or None if there is no wakeword or nothing
+        but fillers after it
+    """
+    match = _utterance_pattern().match(transcript)
+    if not match:
+        return None
+    # Collapse inner whitespace; the regex already trimmed the ends
+    command = " ".join(match.group(1).split())
+    return command or None